@@ -1,21 +1,17 @@
 # app.py (Corrected and Professional Version)
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, abort, render_template, request, jsonify, send_file, send_from_directory
+import functools
 import os
-import sqlite3
-from datetime import datetime, timedelta
-import matplotlib
-matplotlib.use('Agg') # Set non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
+from datetime import date, datetime, time as dt_time
 import pandas as pd
-import time # <-- Import the time module for unique filenames
+import time
 
 # Import your refactored logic modules
-from scraper_logic import run_scraper 
-from cleaner_logic import clean_data
-from database_logic import store_data, setup_database
-from reporter_logic import generate_report
+from database_logic import CATEGORIES_QUERY, connection, get_data_freshness, setup_database
+from task_logic import TASK_STALE_SECONDS, enqueue_report, get_task
+from chart_logic import get_chart, get_skills_comparison, get_trend_data, purge_legacy_charts
+from metrics_logic import render_prometheus
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey' 
@@ -30,12 +26,33 @@ JOB_URLS = {
 }
 
 REPORTS_DIR = 'reports'
+# How long browsers and proxies may reuse dashboard data before revalidating
+API_MAX_AGE = int(os.getenv('API_MAX_AGE', '300'))
+CHART_KINDS = ('trend', 'skills')
+
+# Gunicorn never runs the __main__ block below, so bring the schema up to date on import
+os.makedirs('data', exist_ok=True)
+setup_database()
+purge_legacy_charts()
+
+def read_only(view):
+    """
+    Runs a view on a single read-only checkout of the worker thread's pooled
+    database connection: every query the view makes shares it, and a write
+    slipped in by mistake fails instead of taking the write lock.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with connection(readonly=True):
+            return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/')
 def index():
     job_categories = list(JOB_URLS.keys())
     # Ensure this is passing the integer timestamp, not the function itself
-    return render_template('index.html', job_categories=job_categories, now=int(time.time()))
+    return render_template('index.html', job_categories=job_categories, now=int(time.time()),
+                           poll_limit_seconds=TASK_STALE_SECONDS)
 
 @app.route('/generate', methods=['POST'])
 def generate():
@@ -47,21 +64,18 @@ def generate():
 
     url_slug = JOB_URLS[job_type]
     scrape_url = f"https://remoteok.com/{url_slug}"
-    
-    raw_df = run_scraper(scrape_url)
-    if raw_df is None or raw_df.empty:
-        return jsonify({'status': 'error', 'message': f"Could not find jobs for '{job_type}'."}), 500
-        
-    cleaned_df = clean_data(raw_df)
-    cleaned_df['category'] = job_type 
-    store_data(cleaned_df)
-    report_path = generate_report(category=job_type) 
-    
-    if report_path and os.path.exists(report_path):
-        filename = os.path.basename(report_path)
-        return jsonify({'status': 'success', 'filename': filename})
-    else:
-        return jsonify({'status': 'error', 'message': 'Failed to generate the report file.'}), 500
+
+    # The scrape and LLM call run on a background worker; the client polls /status/<task_id>
+    task_id, created = enqueue_report(job_type, scrape_url)
+    return jsonify({'status': 'queued', 'task_id': task_id, 'coalesced': not created}), 202
+
+@app.route('/status/<task_id>')
+@read_only
+def task_status(task_id):
+    task = get_task(task_id)
+    if task is None:
+        return jsonify({'status': 'error', 'message': 'Unknown task.'}), 404
+    return jsonify(task)
 
 @app.route('/download/<path:filename>')
 def download(filename):
@@ -70,95 +84,85 @@ def download(filename):
 
 def get_all_categories_from_db():
     # This function is correct
-    conn = sqlite3.connect('data/jobs.db')
-    try:
-        df = pd.read_sql_query("SELECT DISTINCT category FROM jobs", conn)
+    with connection() as conn:
+        df = pd.read_sql_query(CATEGORIES_QUERY, conn)
         return sorted(df['category'].dropna().tolist())
-    finally:
-        conn.close()
 
 @app.route('/dashboard')
+@read_only
 def dashboard():
-    selected_category = request.args.get('category', 'software')
-    
-    # <<< CHANGE: Generate a unique timestamp for this specific request >>>
-    # This will be used to create unique filenames to prevent concurrency issues.
-    unique_id = int(time.time())
-
-    # --- 1. Data and Plot for 30-Day Trend ---
-    conn = sqlite3.connect('data/jobs.db')
-    try:
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        query_trend = """
-            SELECT date(date_posted) as post_date, COUNT(*) as job_count
-            FROM jobs WHERE category = ? AND date_posted >= ?
-            GROUP BY post_date ORDER BY post_date ASC
-        """
-        trend_df = pd.read_sql_query(query_trend, conn, params=(selected_category, thirty_days_ago))
-    finally:
-        conn.close()
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(pd.to_datetime(trend_df['post_date']), trend_df['job_count'], marker='o', linestyle='-')
-    plt.title(f'Daily Job Postings for "{selected_category.title()}" (Last 30 Days)', fontsize=16)
-    plt.xlabel('Date'); plt.ylabel('Number of Jobs'); plt.grid(True); plt.tight_layout()
-    # <<< CHANGE: Use the unique ID in the filename >>>
-    trend_chart_path = f'static/trend_{selected_category}_{unique_id}.png'
-    plt.savefig(trend_chart_path)
-    plt.close()
-
-    # --- 2. Data and Plot for Skills Comparison ---
-    conn = sqlite3.connect('data/jobs.db')
-    try:
-        sixty_days_ago = datetime.now() - timedelta(days=60)
-        # <<< CHANGE: Fix the logical bug by adding "category = ?" to the query >>>
-        query_skills = "SELECT date_posted, tags FROM jobs WHERE category = ? AND date_posted >= ?"
-        skills_df = pd.read_sql_query(query_skills, conn, params=(selected_category, sixty_days_ago))
-        skills_df['date_posted'] = pd.to_datetime(skills_df['date_posted'])
-    finally:
-        conn.close()
-
-    one_month_ago = datetime.now() - timedelta(days=30)
-    df_this_month = skills_df[skills_df['date_posted'] >= one_month_ago]
-    df_last_month = skills_df[skills_df['date_posted'] < one_month_ago]
-
-    # Handle cases where one of the months might have no data
-    if not df_this_month.empty:
-        skills_this_month = df_this_month['tags'].str.split(',').explode().str.strip().value_counts().head(10)
-    else:
-        skills_this_month = pd.Series()
-        
-    if not df_last_month.empty:
-        skills_last_month = df_last_month['tags'].str.split(',').explode().str.strip().value_counts().head(10)
-    else:
-        skills_last_month = pd.Series()
-
-    comparison_df = pd.DataFrame({'This Month': skills_this_month, 'Last Month': skills_last_month}).fillna(0).astype(int)
-
-    if not comparison_df.empty:
-        comparison_df.plot(kind='barh', figsize=(12, 8))
-        plt.title(f'Top Skills for "{selected_category.title()}": This Month vs. Last Month', fontsize=16)
-        plt.xlabel('Number of Mentions'); plt.gca().invert_yaxis(); plt.tight_layout()
-        # <<< CHANGE: Use the unique ID in the filename >>>
-        comparison_chart_path = f'static/skills_comparison_{selected_category}_{unique_id}.png'
-        plt.savefig(comparison_chart_path)
-        plt.close()
-    else:
-        comparison_chart_path = None # Set to None if no data to plot
-
+    # The charts are drawn in the browser from the /api/ endpoints below
     return render_template(
         'dashboard.html',
-        trend_chart=trend_chart_path,
-        comparison_chart=comparison_chart_path,
         all_categories=get_all_categories_from_db(),
-        selected_category=selected_category,
-        # <<< CHANGE: Pass the 'now' value for cache busting >>>
-        now=int(time.time()) 
+        selected_category=request.args.get('category', 'software')
     )
 
+def _trend_payload(category):
+    trend_df = get_trend_data(category)
+    return {
+        'category': category,
+        'labels': trend_df['post_date'].tolist(),
+        'job_counts': trend_df['job_count'].astype(int).tolist(),
+    }
+
+def _skills_payload(category):
+    comparison_df = get_skills_comparison(category)
+    return {
+        'category': category,
+        'labels': comparison_df.index.tolist(),
+        'this_month': comparison_df['This Month'].tolist(),
+        'last_month': comparison_df['Last Month'].tolist(),
+    }
+
+def _cacheable_json(category, kind, build_payload):
+    """
+    Serves dashboard data with an ETag on the category's data version and a
+    Last-Modified of its latest ingest, so unchanged data costs one indexed
+    lookup and a 304. The windows are relative to today, so both validators
+    also roll over at midnight.
+    """
+    version, last_ingest = get_data_freshness(category)
+    today = date.today()
+    etag = f'{kind}-{category}-v{version}-{today.isoformat()}'
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build_payload(category))
+    response.set_etag(etag)
+    response.last_modified = max(last_ingest or datetime.min, datetime.combine(today, dt_time.min))
+    response.cache_control.public = True
+    response.cache_control.max_age = API_MAX_AGE
+    return response.make_conditional(request)
+
+@app.route('/api/categories/<category>/trend')
+@read_only
+def api_trend(category):
+    return _cacheable_json(category, 'trend', _trend_payload)
+
+@app.route('/api/categories/<category>/skills')
+@read_only
+def api_skills(category):
+    return _cacheable_json(category, 'skills', _skills_payload)
+
+@app.route('/charts/<category>/<kind>.png')
+@read_only
+def chart_image(category, kind):
+    # Server-rendered fallback for browsers without JavaScript
+    if kind not in CHART_KINDS:
+        abort(404)
+    chart_path = get_chart(category, kind)
+    if not chart_path:
+        abort(404)
+    return send_file(os.path.abspath(chart_path), mimetype='image/png', max_age=API_MAX_AGE)
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus scrape target: this worker's timers and counters plus the last nightly run
+    return app.response_class(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     if not os.path.exists(REPORTS_DIR): os.makedirs(REPORTS_DIR)
     if not os.path.exists('data'): os.makedirs('data')
     if not os.path.exists('static'): os.makedirs('static') # <-- Add check for static dir
-    setup_database()
     app.run(debug=True)
\ No newline at end of file
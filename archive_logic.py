@@ -0,0 +1,177 @@
+# archive_logic.py
+
+import argparse
+import functools
+import operator
+import os
+import uuid
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from database_logic import connection
+
+# Root of the Parquet history: one directory per category and scrape date,
+# e.g. data/archive/category=software/scrape_date=2026-01-31/<run>-0.parquet
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'data/archive')
+
+# Arrow types of the archived columns. Company and location repeat a lot, so
+# they are dictionary-encoded and come back as pandas categoricals.
+ARCHIVE_SCHEMA = pa.schema([
+    ('slug', pa.string()),
+    ('job_title', pa.string()),
+    ('company', pa.dictionary(pa.int32(), pa.string())),
+    ('location', pa.dictionary(pa.int32(), pa.string())),
+    # Parquet has no second resolution; milliseconds is the coarsest it stores
+    ('date_posted', pa.timestamp('ms')),
+    ('tags', pa.list_(pa.string())),
+    ('normalized_title', pa.string()),
+    ('category', pa.string()),
+    ('scrape_date', pa.date32()),
+])
+# The partition columns live in the directory names, not in the files
+PARTITIONING = ds.partitioning(pa.schema([('category', pa.string()), ('scrape_date', pa.date32())]), flavor='hive')
+
+# What each file holds: the partition columns are only in its directory names
+FILE_SCHEMA = pa.schema([field for field in ARCHIVE_SCHEMA if field.name not in PARTITIONING.schema.names])
+
+# Rows per chunk when backfilling the archive from SQLite
+_BACKFILL_CHUNK = 50000
+
+def _archive_frame(cleaned_df, scrape_date):
+    """One row per (posting, category) in ARCHIVE_SCHEMA's columns, whether the frame has 'category' or 'categories'."""
+    df = cleaned_df
+    if 'categories' in df:
+        df = df.drop(columns='category', errors='ignore').explode('categories').rename(columns={'categories': 'category'})
+    df = df[df['category'].notna()] if 'category' in df else df.iloc[0:0]
+    return pd.DataFrame({
+        'slug': df['slug'].astype(object),
+        'job_title': df['job_title'].astype(object),
+        'company': df['company'].astype(object),
+        'location': df['location'].astype(object),
+        'date_posted': pd.to_datetime(df['date_posted']),
+        'tags': [list(tags) if isinstance(tags, (list, tuple)) else [] for tags in df['tags']],
+        'normalized_title': df['normalized_title'].astype(object),
+        'category': df['category'].astype(str),
+        'scrape_date': scrape_date,
+    })
+
+def _scrape_date(scrape_date):
+    return date.fromisoformat(str(scrape_date)) if scrape_date else date.today()
+
+def archive_jobs(cleaned_df, scrape_date=None):
+    """
+    Appends cleaned jobs to the Parquet archive, partitioned by category and
+    scrape date (today unless given): one new file per category in the frame.
+    Returns the rows written.
+    """
+    if cleaned_df is None or cleaned_df.empty:
+        return 0
+    scrape_date = _scrape_date(scrape_date)
+    frame = _archive_frame(cleaned_df, scrape_date)
+    if frame.empty:
+        return 0
+    table = pa.Table.from_pandas(frame, schema=ARCHIVE_SCHEMA, preserve_index=False, safe=False)
+    ds.write_dataset(
+        table, ARCHIVE_DIR, format='parquet', partitioning=PARTITIONING,
+        basename_template=f'{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    print(f"Archived {len(frame)} job rows to {ARCHIVE_DIR}.")
+    return len(frame)
+
+class CategoryArchive:
+    """
+    Appends one category's cleaned batches to a single new archive file, a
+    Parquet row group per batch, so a category stored in batches adds one
+    file per run rather than one per batch. The file is created on the first
+    non-empty write and finished by close().
+    """
+
+    def __init__(self, category, scrape_date=None):
+        scrape_date = _scrape_date(scrape_date)
+        self.category = category
+        self.scrape_date = scrape_date
+        self.path = os.path.join(ARCHIVE_DIR, f'category={category}', f'scrape_date={scrape_date.isoformat()}',
+                                 f'{uuid.uuid4().hex}-0.parquet')
+        self.rows = 0
+        self._writer = None
+
+    def write(self, cleaned_df):
+        """Appends a batch of cleaned jobs of this category. Returns the rows written."""
+        if cleaned_df is None or cleaned_df.empty:
+            return 0
+        frame = _archive_frame(cleaned_df.assign(category=self.category), self.scrape_date)
+        table = pa.Table.from_pandas(frame[FILE_SCHEMA.names], schema=FILE_SCHEMA, preserve_index=False, safe=False)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, FILE_SCHEMA)
+        self._writer.write_table(table)
+        self.rows += len(frame)
+        return len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            print(f"Archived {self.rows} '{self.category}' job rows to {self.path}.")
+
+def load_jobs(columns=None, categories=None, start=None, end=None, posted_since=None):
+    """
+    Reads archived jobs into a DataFrame, loading only what is asked for:
+    `columns` (default all), `categories` and scrape dates in [start, end)
+    prune whole partition directories before any file is opened, and
+    `posted_since` skips row groups by their date_posted statistics.
+    Dates may be date objects or ISO strings.
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return pd.DataFrame(columns=columns or ARCHIVE_SCHEMA.names)
+    dataset = ds.dataset(ARCHIVE_DIR, format='parquet', partitioning=PARTITIONING)
+    filters = []
+    if categories is not None:
+        filters.append(ds.field('category').isin(list(categories)))
+    if start is not None:
+        filters.append(ds.field('scrape_date') >= pa.scalar(date.fromisoformat(str(start)), pa.date32()))
+    if end is not None:
+        filters.append(ds.field('scrape_date') < pa.scalar(date.fromisoformat(str(end)), pa.date32()))
+    if posted_since is not None:
+        filters.append(ds.field('date_posted') >= pa.scalar(pd.Timestamp(posted_since).to_pydatetime(), pa.timestamp('ms')))
+    table = dataset.to_table(columns=columns, filter=functools.reduce(operator.and_, filters) if filters else None)
+    return table.to_pandas()
+
+def backfill_from_database():
+    """
+    Exports every job already in SQLite to the archive, one row per category
+    it is linked to, dated by the run that last scraped it. For seeding the
+    archive once; running it twice archives everything twice.
+    """
+    total = 0
+    with connection() as conn:
+        chunks = pd.read_sql_query('''
+            SELECT j.slug, j.job_title, j.company, j.location, j.date_posted, j.tags,
+                   j.normalized_title, jc.category, j.scrape_run_date
+            FROM jobs j JOIN job_categories jc ON jc.job_id = j.id
+            ORDER BY j.scrape_run_date
+        ''', conn, chunksize=_BACKFILL_CHUNK)
+        for chunk in chunks:
+            chunk['tags'] = [tags.split(',') if tags else [] for tags in chunk['tags']]
+            run_dates = pd.to_datetime(chunk.pop('scrape_run_date'), format='ISO8601').dt.date
+            for scrape_date, rows in chunk.groupby(run_dates):
+                total += archive_jobs(rows, scrape_date)
+    print(f"Backfilled {total} job rows from the database into {ARCHIVE_DIR}.")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet archive of scraped jobs.")
+    parser.add_argument('--backfill', action='store_true', help="Export the jobs already in SQLite to the archive.")
+    args = parser.parse_args()
+    if args.backfill:
+        backfill_from_database()
+    else:
+        jobs = load_jobs(columns=['category'])
+        print(f"{len(jobs)} archived job rows in {ARCHIVE_DIR}.")
+        if not jobs.empty:
+            print(jobs['category'].value_counts().to_string())
@@ -0,0 +1,77 @@
+# benchmarks/bench_cleaner.py
+#
+# Times clean_data on synthetic frames against the implementation it replaced:
+#   python benchmarks/bench_cleaner.py --rows 100000 1000000
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_raw_jobs
+from cleaner_logic import clean_data
+
+def legacy_clean_data(raw_df):
+    """clean_data as it was before the single-pass rewrite, kept as the baseline."""
+    df = raw_df.copy()
+    df.sort_values('date_posted', ascending=False, inplace=True)
+    df.drop_duplicates(subset=['job_title', 'company'], keep='first', inplace=True)
+    promo_keywords = ['bootcamp', 'guaranteed', 'money back']
+    df = df[~df['job_title'].str.contains('|'.join(promo_keywords), case=False, na=False)]
+    df['normalized_title'] = df['job_title'].str.lower()
+    title_replacements = {
+        r'\bml\b': 'machine learning', 'software engineer': 'swe',
+        'data scientist': 'ds', 'data analyst': 'da', 'product manager': 'pm'
+    }
+    for pattern, replacement in title_replacements.items():
+        df['normalized_title'] = df['normalized_title'].str.replace(pattern, replacement, regex=True)
+    df['tags'] = df['tags'].apply(lambda x: [str(tag) for tag in x] if isinstance(x, list) else [])
+    df['date_posted'] = pd.to_datetime(df['date_posted'], errors='coerce')
+    df.dropna(subset=['date_posted'], inplace=True)
+    return df
+
+def _best_of(func, raw_df, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(raw_df)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _check_parity(legacy_df, new_df):
+    """Both versions must keep the same rows with the same values."""
+    columns = list(legacy_df.columns)
+    legacy = legacy_df.sort_values('slug').reset_index(drop=True)
+    new = new_df[columns].sort_values('slug').reset_index(drop=True)
+    for column in ('company', 'location'):
+        new[column] = new[column].astype(object)
+    pd.testing.assert_frame_equal(legacy, new, check_dtype=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_data against the previous implementation.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 250_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size; the fastest is reported.")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy s':>10} {'new s':>10} {'legacy rows/s':>14} {'new rows/s':>14} {'speedup':>8}")
+    for rows in args.rows:
+        raw_df = make_raw_jobs(rows)
+        legacy_time, legacy_df = _best_of(legacy_clean_data, raw_df, args.repeat)
+        # clean_data prints a summary line per call; keep the table readable
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                new_time, new_df = _best_of(clean_data, raw_df, args.repeat)
+            finally:
+                sys.stdout = stdout
+        _check_parity(legacy_df, new_df)
+        print(f"{rows:>10} {legacy_time:>10.3f} {new_time:>10.3f} {rows / legacy_time:>14,.0f} "
+              f"{rows / new_time:>14,.0f} {legacy_time / new_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
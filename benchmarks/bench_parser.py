@@ -0,0 +1,59 @@
+# benchmarks/bench_parser.py
+#
+# Checks that the lxml row parser produces exactly the records of the
+# BeautifulSoup one, then compares their throughput:
+#   python benchmarks/bench_parser.py --rows 1000 5000
+#   python benchmarks/bench_parser.py --html saved_page.html
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_listing_html
+import scraper_logic
+
+def parse_page(html, parser):
+    """Parses every job row of `html` with the given SCRAPER_PARSER engine."""
+    find_rows, parse_row = scraper_logic._PARSERS[parser]
+    return [job for job in map(parse_row, find_rows(html)) if job]
+
+def _best_of(html, parser, repeat):
+    best, jobs = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        jobs = parse_page(html, parser)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the bs4 and lxml job row parsers.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--html', nargs='*', default=[], help="Saved listing pages to use instead of synthetic ones.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per page; the fastest is reported.")
+    args = parser.parse_args()
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages = [(f'{rows} rows', make_listing_html(rows)) for rows in args.rows]
+
+    print(f"{'page':>14} {'jobs':>6} {'bs4 s':>8} {'lxml s':>8} {'bs4 rows/s':>12} {'lxml rows/s':>12} {'speedup':>8}")
+    for name, html in pages:
+        bs4_time, bs4_jobs = _best_of(html, 'bs4', args.repeat)
+        lxml_time, lxml_jobs = _best_of(html, 'lxml', args.repeat)
+        if bs4_jobs != lxml_jobs:
+            mismatch = next((a, b) for a, b in zip(bs4_jobs + [None], lxml_jobs + [None]) if a != b)
+            sys.exit(f"{name}: parsers disagree, first difference:\n  bs4:  {mismatch[0]}\n  lxml: {mismatch[1]}")
+        jobs = len(bs4_jobs)
+        print(f"{name:>14} {jobs:>6} {bs4_time:>8.3f} {lxml_time:>8.3f} {jobs / bs4_time:>12,.0f} "
+              f"{jobs / lxml_time:>12,.0f} {bs4_time / lxml_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_startup.py
+#
+# Measures the cold start of the app's entry points: each module is imported
+# in a fresh interpreter, the way a gunicorn worker or a cron run starts, and
+# the import time and resident memory afterwards are reported:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --modules app scheduled_scraper --repeat 5
+# Run it on two checkouts to compare before and after a change.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: import the module, then report the time it took and the RSS
+_CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+if not rss_kb:
+    # No /proc (macOS): fall back to the peak, which ru_maxrss reports in bytes there
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_kb / 1024, 'modules': len(sys.modules)}}))
+"""
+
+def measure(module, workdir):
+    """Imports `module` once in a fresh interpreter and returns its timing and memory."""
+    env = dict(os.environ, OPENROUTER_API_KEY=os.environ.get('OPENROUTER_API_KEY', 'benchmark'))
+    result = subprocess.run(
+        [sys.executable, '-c', _CHILD.format(repo=REPO_DIR, module=module)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Time cold imports of the app's entry points.")
+    parser.add_argument('--modules', nargs='+', default=['app', 'scheduled_scraper', 'task_logic', 'reporter_logic'])
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per module; the fastest is reported.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<20} {'import s':>9} {'RSS MB':>8} {'modules':>8}")
+    # app.py creates data/ and the database on import, so keep that out of the checkout
+    with tempfile.TemporaryDirectory(prefix='job-scraper-startup-') as workdir:
+        for module in args.modules:
+            runs = [measure(module, workdir) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run['seconds'])
+            results[module] = best
+            print(f"{module:<20} {best['seconds']:>9.3f} {best['rss_mb']:>8.1f} {best['modules']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
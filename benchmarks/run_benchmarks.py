@@ -0,0 +1,174 @@
+# benchmarks/run_benchmarks.py
+#
+# Replays synthetic listing pages through the whole pipeline offline (no
+# remoteok.com, no Chrome, stubbed LLM) and reports each stage's time,
+# rows/s and peak memory:
+#   python benchmarks/run_benchmarks.py --rows 1000 10000 --output results.json
+#   python benchmarks/run_benchmarks.py --rows 1000 10000 --compare results.json
+# Everything is written to a throwaway directory, never to data/ or reports/.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Set before the app modules read them at import time
+os.environ['LLM_BACKEND'] = 'stub'
+os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import pandas as pd
+
+from benchmarks.synthetic import make_listing_html
+import scraper_logic
+from cleaner_logic import clean_data
+from database_logic import get_data_freshness, setup_database, store_data
+from chart_logic import get_skills_comparison, get_trend_data
+from reporter_logic import generate_report
+
+def _parse_pages(pages, parser):
+    """Every category's page through the SCRAPER_PARSER row parser, as {category: [job, ...]}."""
+    find_rows, parse_row = scraper_logic._PARSERS[parser]
+    return {category: [job for job in map(parse_row, find_rows(html)) if job] for category, html in pages.items()}
+
+def _clean(parsed):
+    return {category: clean_data(pd.DataFrame(jobs), category=category) for category, jobs in parsed.items()}
+
+def _store(cleaned):
+    """One store_data per category, as the nightly run's _checkpoint_category does; shared postings are relinked."""
+    for df in cleaned.values():
+        if not store_data(df):
+            raise RuntimeError("store_data stored nothing for a category")
+
+def _dashboard(categories):
+    """The reads behind /dashboard and its JSON API for every category."""
+    for category in categories:
+        get_data_freshness(category)
+        get_trend_data(category)
+        get_skills_comparison(category)
+
+def _reports(categories):
+    paths = [generate_report(category) for category in categories]
+    if not all(paths):
+        raise RuntimeError("generate_report returned no report for some categories")
+
+def _measure(stage, func, rows, trace):
+    """Runs func() once, returning its result and the stage's time, rows/s and peak traced memory."""
+    if trace:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    stats = {'seconds': round(elapsed, 4), 'rows': rows, 'rows_per_second': round(rows / elapsed, 1) if elapsed else None}
+    if trace:
+        stats['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - baseline) / 2**20, 2)
+    print(f"  {stage:<10} {elapsed:8.3f}s  {rows:>8} rows  {stats['rows_per_second'] or 0:>12,.0f} rows/s"
+          + (f"  {stats['peak_mb']:>8.1f} MB peak" if trace else ''))
+    return result, stats
+
+def run_pipeline(rows, categories, overlap, parser, trace):
+    """
+    One pass over `categories` synthetic pages of `rows` rows each, the pages
+    of neighbouring categories sharing `overlap` of their postings, in a
+    fresh temporary working directory. Returns {stage: stats}.
+    """
+    step = max(1, int(rows * (1 - overlap)))
+    now_epoch = int(time.time())
+    pages = {f'category{k}': make_listing_html(rows, first_id=k * step, now_epoch=now_epoch)
+             for k in range(categories)}
+    names = list(pages)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='job-scraper-bench-') as workdir:
+        os.chdir(workdir)
+        try:
+            os.makedirs('data')
+            os.makedirs('reports')
+            # The report loads its font from the relative fonts/ path
+            os.symlink(os.path.join(REPO_DIR, 'fonts'), 'fonts')
+            setup_database()
+            stages = {}
+            parsed, stages['parse'] = _measure('parse', lambda: _parse_pages(pages, parser), rows * categories, trace)
+            parsed_rows = sum(len(jobs) for jobs in parsed.values())
+            cleaned, stages['clean'] = _measure('clean', lambda: _clean(parsed), parsed_rows, trace)
+            cleaned_rows = sum(len(df) for df in cleaned.values())
+            _, stages['store'] = _measure('store', lambda: _store(cleaned), cleaned_rows, trace)
+            _, stages['dashboard'] = _measure('dashboard', lambda: _dashboard(names), cleaned_rows, trace)
+            _, stages['report'] = _measure('report', lambda: _reports(names), cleaned_rows, trace)
+        finally:
+            os.chdir(cwd)
+    return stages
+
+def compare(results, baseline, threshold):
+    """Prints each stage's time against the baseline run with the same row count; returns the regressions."""
+    previous = {run['rows']: run['stages'] for run in baseline['runs']}
+    regressions = []
+    print(f"\n--- Compared with {baseline['created_at']} ---")
+    print(f"{'rows':>8} {'stage':<10} {'before s':>9} {'after s':>9} {'change':>8}")
+    for run in results['runs']:
+        for stage, stats in run['stages'].items():
+            before = previous.get(run['rows'], {}).get(stage)
+            if not before or not before['seconds']:
+                continue
+            change = stats['seconds'] / before['seconds'] - 1
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((run['rows'], stage, change))
+            print(f"{run['rows']:>8} {stage:<10} {before['seconds']:>9.3f} {stats['seconds']:>9.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrape -> clean -> store -> report pipeline offline.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help="Rows per category page.")
+    parser.add_argument('--categories', type=int, default=3, help="Category pages per run (default: %(default)s).")
+    parser.add_argument('--overlap', type=float, default=0.3,
+                        help="Share of postings neighbouring categories have in common (default: %(default)s).")
+    parser.add_argument('--parser', choices=sorted(scraper_logic._PARSERS), default=scraper_logic.SCRAPER_PARSER)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip tracemalloc, which slows the stages down, to time them undisturbed.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="Results JSON of an earlier run to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Slowdown over the baseline reported as a regression (default: %(default)s).")
+    args = parser.parse_args()
+
+    trace = not args.no_memory
+    if trace:
+        tracemalloc.start()
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'parser': args.parser,
+        'categories': args.categories,
+        'overlap': args.overlap,
+        'memory_traced': trace,
+        'runs': [],
+    }
+    for rows in args.rows:
+        print(f"\n--- {args.categories} categories x {rows} rows ---")
+        results['runs'].append({'rows': rows, 'stages': run_pipeline(rows, args.categories, args.overlap, args.parser, trace)})
+    if trace:
+        tracemalloc.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
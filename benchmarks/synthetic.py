@@ -0,0 +1,84 @@
+# benchmarks/synthetic.py
+
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+TITLES = [
+    'Senior Software Engineer', 'ML Engineer', 'Data Scientist', 'Data Analyst',
+    'Product Manager', 'Customer Support Specialist', 'Frontend Developer',
+    'Backend Engineer', 'DevOps Engineer', 'Sales Development Representative',
+    'Growth Marketing Lead', 'Product Designer', 'Security Engineer',
+    'Coding Bootcamp Mentor', 'Guaranteed Income Sales Rep',
+]
+COMPANIES = [f'Company {i}' for i in range(2000)]
+LOCATIONS = ['Worldwide', 'USA', 'Europe', 'UK', 'Canada', 'LATAM', 'APAC', 'Germany', 'Remote']
+TAGS = ['python', 'javascript', 'react', 'sql', 'aws', 'docker', 'kubernetes', 'golang',
+        'design', 'sales', 'marketing', 'support', 'security', 'senior', 'management']
+
+def make_raw_jobs(rows, seed=0):
+    """
+    A scraper-shaped DataFrame of `rows` synthetic postings: ISO date strings,
+    repeated title/company pairs for the de-duplication step, a share of
+    promotional titles and a few unparseable dates.
+    """
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    records = []
+    for i in range(rows):
+        date_posted = (now - timedelta(minutes=rng.randrange(60 * 24 * 90))).isoformat()
+        if rng.random() < 0.001:
+            date_posted = '0000-00-00'
+        records.append({
+            'slug': f'job-{i}',
+            'job_title': f'{rng.choice(TITLES)} {rng.randrange(200)}',
+            'company': rng.choice(COMPANIES),
+            'location': rng.choice(LOCATIONS),
+            'date_posted': date_posted,
+            'tags': rng.sample(TAGS, rng.randrange(1, 6)),
+        })
+    return pd.DataFrame.from_records(records)
+
+def _job_row_html(rng, i, now_epoch):
+    """One remoteok-style <tr class="job">, with the odd quirks real listings have."""
+    title = rng.choice(TITLES)
+    company = rng.choice(COMPANIES)
+    locations = [f'<div class="location">🌏 {rng.choice(LOCATIONS)}</div>']
+    if rng.random() < 0.5:
+        # Salary shares the location class and must never be picked as the location
+        locations.insert(rng.randrange(2), '<div class="location tooltip">💰 $80k - $120k</div>')
+    if rng.random() < 0.05:
+        locations = []
+    tags = ''.join(f'<a class="action-add-tag"><div class="tag tag-{tag}"><h3>\n  {tag} </h3></div></a>'
+                   for tag in rng.sample(TAGS, rng.randrange(0, 6)))
+    company_html = f'<span itemprop="hiringOrganization"><h3 itemprop="name">  {company}\n</h3></span>'
+    if rng.random() < 0.01:
+        company_html = ''
+    epoch_attr = f' data-epoch="{now_epoch - i * 600}"' if rng.random() > 0.01 else ''
+    return (
+        f'<tr class="job job-{i} {"highlighted " if rng.random() < 0.1 else ""}" data-slug="remote-job-{i}"'
+        f' data-id="{i}"{epoch_attr}>'
+        f'<td class="image"><img src="/logo.png"></td>'
+        f'<td class="company position company_and_position">'
+        f'<a itemprop="url" href="/remote-jobs/{i}"><h2 itemprop="title"> {title} <!-- new --></h2></a>'
+        f'{company_html}{"".join(locations)}</td>'
+        f'<td class="tags">{tags}</td>'
+        f'<td class="time"><time datetime="2026-01-01T00:00:00+00:00">1d</time></td>'
+        f'</tr>'
+        f'<tr class="expand expand-{i}" data-id="{i}" style="display:none"><td colspan="4">Details</td></tr>'
+    )
+
+def make_listing_html(rows, seed=0, first_id=0, now_epoch=1767225600):
+    """
+    A remoteok-style listing page with `rows` job rows, plus an ad row and
+    a row without a slug, for checking the row parsers against each other.
+    Each row is generated from its own id, so pages with overlapping
+    [first_id, first_id + rows) ranges list the same postings, as categories do.
+    """
+    body = [_job_row_html(random.Random(seed * 1000003 + i), i, now_epoch)
+            for i in range(first_id, first_id + rows)]
+    body.insert(min(3, rows), '<tr class="job ad"><td>Sponsored</td></tr>')
+    body.insert(min(5, rows), '<tr class="job" data-slug="no-title"><td><h3 itemprop="name">Acme</h3></td></tr>')
+    return ('<!doctype html><html><head><meta charset="utf-8"><title>Remote Jobs</title></head><body>'
+            f'<table id="jobsboard"><tbody>{"".join(body)}</tbody></table></body></html>')
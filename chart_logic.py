@@ -0,0 +1,150 @@
+# chart_logic.py
+
+import glob
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import metrics_logic
+from database_logic import TOP_SKILLS_BETWEEN_QUERY, TREND_QUERY, connection, get_data_version
+
+CHARTS_DIR = 'static/charts'
+# Most charts kept per worker; evicted charts are deleted from disk as well
+CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '64'))
+
+# (category, kind, data version, day) -> chart path, or None when there was nothing to plot
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_render_lock = threading.Lock()
+
+def _top_skills(conn, category, start, end, limit=10):
+    """Returns the `limit` most mentioned tags for `category` posted on days in [start, end) as a Series."""
+    df = pd.read_sql_query(TOP_SKILLS_BETWEEN_QUERY, conn, params=(category, start, end, limit))
+    return pd.Series(df['mentions'].values, index=df['tag'], dtype=int)
+
+def get_trend_data(category):
+    """Daily posting counts for `category` over the last 30 days, as a DataFrame of post_date/job_count."""
+    with connection() as conn:
+        thirty_days_ago = (datetime.now() - timedelta(days=30)).date().isoformat()
+        return pd.read_sql_query(TREND_QUERY, conn, params=(category, thirty_days_ago))
+
+def get_skills_comparison(category):
+    """
+    Top skills for `category` in the last 30 days next to the 30 days before,
+    as a DataFrame indexed by tag with 'This Month' and 'Last Month' columns.
+    """
+    one_month_ago = (datetime.now() - timedelta(days=30)).date().isoformat()
+    sixty_days_ago = (datetime.now() - timedelta(days=60)).date().isoformat()
+    with connection() as conn:
+        # Served from the daily_tag_counts rollup maintained at ingest time
+        skills_this_month = _top_skills(conn, category, one_month_ago, '9999-12-31')
+        skills_last_month = _top_skills(conn, category, sixty_days_ago, one_month_ago)
+    return pd.DataFrame({'This Month': skills_this_month, 'Last Month': skills_last_month}).fillna(0).astype(int)
+
+def _new_figure(figsize):
+    """
+    A matplotlib Figure. matplotlib is only imported once a chart actually
+    has to be drawn, so app workers that serve cached charts never load it.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    # The object-oriented API keeps no global pyplot state, so threads can't trample each other
+    return Figure(figsize=figsize)
+
+def _render_trend(category, path):
+    trend_df = get_trend_data(category)
+
+    fig = _new_figure((12, 6))
+    ax = fig.subplots()
+    ax.plot(pd.to_datetime(trend_df['post_date']), trend_df['job_count'], marker='o', linestyle='-')
+    ax.set_title(f'Daily Job Postings for "{category.title()}" (Last 30 Days)', fontsize=16)
+    ax.set_xlabel('Date'); ax.set_ylabel('Number of Jobs'); ax.grid(True); fig.tight_layout()
+    fig.savefig(path, format='png')
+    return True
+
+def _render_skills(category, path):
+    comparison_df = get_skills_comparison(category)
+    if comparison_df.empty:
+        return False
+
+    fig = _new_figure((12, 8))
+    ax = fig.subplots()
+    comparison_df.plot(kind='barh', ax=ax)
+    ax.set_title(f'Top Skills for "{category.title()}": This Month vs. Last Month', fontsize=16)
+    ax.set_xlabel('Number of Mentions'); ax.invert_yaxis(); fig.tight_layout()
+    fig.savefig(path, format='png')
+    return True
+
+_RENDERERS = {'trend': _render_trend, 'skills': _render_skills}
+
+def _chart_path(category, kind, version, day):
+    safe_category = re.sub(r'[^a-z0-9_-]', '_', category.lower())
+    return os.path.join(CHARTS_DIR, f'{kind}_{safe_category}_v{version}_{day}.png')
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _remove_stale_versions(path):
+    """Deletes older renders of the same chart once a newer one exists."""
+    prefix = path.rsplit('_v', 1)[0]
+    for old_path in glob.glob(f'{glob.escape(prefix)}_v*.png'):
+        if old_path != path:
+            _remove_file(old_path)
+
+def get_chart(category, kind):
+    """
+    Returns the static path of the `kind` chart ('trend' or 'skills') for
+    `category`, or None if there is no data to plot. Charts are keyed on the
+    category's data version and the current day, so matplotlib only runs
+    after new data lands (or when the date window moves). A PNG rendered by
+    another worker is reused straight from disk.
+    """
+    key = (category, kind, get_data_version(category), date.today().isoformat())
+    with _cache_lock:
+        if key in _cache and (_cache[key] is None or os.path.exists(_cache[key])):
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    path = _chart_path(*key)
+    with _render_lock:
+        if not os.path.exists(path):
+            os.makedirs(CHARTS_DIR, exist_ok=True)
+            # Render to a temp name first so other workers never serve a half-written PNG
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            try:
+                with metrics_logic.timer('chart_render'):
+                    rendered = _RENDERERS[kind](category, tmp_path)
+                if rendered:
+                    os.replace(tmp_path, path)
+                    print(f"Rendered {kind} chart for '{category}' at {path}")
+            finally:
+                _remove_file(tmp_path)
+            if not rendered:
+                path = None
+        if path:
+            _remove_stale_versions(path)
+
+    with _cache_lock:
+        _cache[key] = path
+        _cache.move_to_end(key)
+        while len(_cache) > CHART_CACHE_SIZE:
+            _, evicted_path = _cache.popitem(last=False)
+            if evicted_path:
+                _remove_file(evicted_path)
+    return path
+
+def purge_legacy_charts(static_dir='static'):
+    """Removes the per-request trend_<cat>_<ts>.png files older versions of the dashboard left behind."""
+    legacy = glob.glob(os.path.join(static_dir, 'trend_*.png')) + glob.glob(os.path.join(static_dir, 'skills_comparison*.png'))
+    for path in legacy:
+        _remove_file(path)
+    if legacy:
+        print(f"Removed {len(legacy)} legacy chart files from {static_dir}/.")
@@ -1,42 +1,133 @@
 # cleaner_logic.py
 
+import re
+import time
+from itertools import chain
+
+import numpy as np
 import pandas as pd
-import ast
+from pandas.api.types import infer_dtype
+
+import metrics_logic
+
+PROMO_KEYWORDS = ['bootcamp', 'guaranteed', 'money back']
+# (pattern, replacement) pairs for normalized titles, applied together in a single pass
+TITLE_REPLACEMENTS = [
+    (r'\bml\b', 'machine learning'), ('software engineer', 'swe'),
+    ('data scientist', 'ds'), ('data analyst', 'da'), ('product manager', 'pm'),
+]
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['company', 'location', 'category']
 
-def clean_data(raw_df):
+_PROMO_PATTERN = re.compile('|'.join(PROMO_KEYWORDS), re.IGNORECASE)
+# One capturing group per rule, so the group that matched picks the replacement
+_TITLE_PATTERN = re.compile('|'.join(f'({pattern})' for pattern, _ in TITLE_REPLACEMENTS))
+_TITLE_LOOKUP = [replacement for _, replacement in TITLE_REPLACEMENTS]
+
+def _title_replacement(match):
+    return _TITLE_LOOKUP[match.lastindex - 1]
+
+def _normalize_titles(unique_titles):
+    """
+    Lower-cases each distinct title and applies every TITLE_REPLACEMENTS rule
+    in one regex pass. Returns an object array with one extra trailing NaN,
+    so factorize's -1 code for missing titles indexes straight into it.
+    """
+    normalized = np.empty(len(unique_titles) + 1, dtype=object)
+    normalized[:-1] = [_TITLE_PATTERN.sub(_title_replacement, title.lower()) if isinstance(title, str) else np.nan
+                       for title in unique_titles]
+    normalized[-1] = np.nan
+    return normalized
+
+def _clean_tags(tags):
+    """Makes every row's tags a list of strings; rows that aren't lists become []."""
+    values = tags.to_numpy()
+    flat = list(chain.from_iterable(value for value in values if isinstance(value, list)))
+    if infer_dtype(flat, skipna=False) in ('string', 'empty'):
+        # Already the common case straight from the scraper: keep the lists as they are
+        return [value if isinstance(value, list) else [] for value in values]
+    return [[str(tag) for tag in value] if isinstance(value, list) else [] for value in values]
+
+def _parse_dates(raw_dates):
+    """
+    Parses posting dates, with NaT for anything unparseable. Scraped dates are
+    ISO 8601, which parses without per-element format guessing; only if some
+    other format turns up does the whole column go through the general parser.
+    """
+    dates = pd.to_datetime(raw_dates, format='ISO8601', errors='coerce')
+    retry = dates.isna() & raw_dates.notna()
+    # format='mixed' parses element by element, which is what the fallback
+    # needs, without the "Could not infer format" warning of a bare call
+    if retry.any() and pd.to_datetime(raw_dates[retry], format='mixed', errors='coerce').notna().any():
+        dates = pd.to_datetime(raw_dates, format='mixed', errors='coerce')
+    return dates
+
+def clean_data(raw_df, category=None):
     """
     Takes a raw pandas DataFrame, cleans and validates it,
-    and returns a cleaned DataFrame.
+    and returns a cleaned DataFrame. If `category` is given it is
+    added as the 'category' column. `raw_df` itself is left untouched.
     """
     if raw_df is None or raw_df.empty:
         print("Input DataFrame is empty. No data to clean.")
         return pd.DataFrame()
 
-    df = raw_df.copy()
+    started = time.perf_counter()
+    # Every step below only builds a mask over row positions; the rows that
+    # survive are copied out of raw_df once, at the end.
+    dates = _parse_dates(raw_df['date_posted']).reset_index(drop=True)
+    # Titles repeat a lot, so the promo filter and title rules run once per distinct title
+    title_codes, unique_titles = pd.factorize(raw_df['job_title'])
 
-    # 1. Handle Duplicates
-    df.sort_values('date_posted', ascending=False, inplace=True)
-    df.drop_duplicates(subset=['job_title', 'company'], keep='first', inplace=True)
+    # 1. Handle Duplicates: keep the newest posting of each title/company pair
+    order = dates.sort_values(ascending=False, na_position='last').index.to_numpy()
+    keep = ~raw_df[['job_title', 'company']].iloc[order].duplicated(keep='first').to_numpy()
 
     # 2. Filter Out Promotional Content
-    promo_keywords = ['bootcamp', 'guaranteed', 'money back']
-    df = df[~df['job_title'].str.contains('|'.join(promo_keywords), case=False, na=False)]
-
-    # 3. Normalize Job Titles
-    df['normalized_title'] = df['job_title'].str.lower()
-    title_replacements = {
-        r'\bml\b': 'machine learning', 'software engineer': 'swe',
-        'data scientist': 'ds', 'data analyst': 'da', 'product manager': 'pm'
-    }
-    for pattern, replacement in title_replacements.items():
-        df['normalized_title'] = df['normalized_title'].str.replace(pattern, replacement, regex=True)
-
-    # 4. Process and Clean Tags (tags are already a list, just ensure they are strings)
-    df['tags'] = df['tags'].apply(lambda x: [str(tag) for tag in x] if isinstance(x, list) else [])
-
-    # 5. Validate Dates
-    df['date_posted'] = pd.to_datetime(df['date_posted'], errors='coerce')
-    df.dropna(subset=['date_posted'], inplace=True)
-    
+    is_promo = np.append(np.asarray(unique_titles.str.contains(_PROMO_PATTERN, na=False), dtype=bool), False)
+    keep &= ~is_promo[title_codes[order]]
+
+    # 3. Validate Dates
+    keep &= dates.notna().to_numpy()[order]
+
+    survivors = order[keep]
+    df = raw_df.take(survivors)
+    df['date_posted'] = dates.take(survivors).array
+
+    # 4. Normalize Job Titles
+    df['normalized_title'] = _normalize_titles(unique_titles)[title_codes[survivors]]
+
+    # 5. Process and Clean Tags (tags are already a list, just ensure they are strings)
+    df['tags'] = _clean_tags(df['tags'])
+
+    if category is not None:
+        df['category'] = category
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+
+    metrics_logic.observe('clean', time.perf_counter() - started)
+    metrics_logic.inc('rows_dropped', len(raw_df) - len(df))
     print(f"Data cleaned. {len(df)} jobs remaining.")
-    return df
\ No newline at end of file
+    return df
+
+def clean_batches(job_batches, category=None):
+    """
+    Cleans an iterable of job-dict batches one batch at a time and yields a
+    cleaned DataFrame per non-empty batch. Batches arrive newest first, so a
+    title/company pair kept from an earlier batch is dropped from later ones,
+    as clean_data would have done over the whole set.
+    """
+    seen = set()
+    for batch in job_batches:
+        df = clean_data(pd.DataFrame(batch), category=category)
+        if df.empty:
+            continue
+        keys = list(zip(df['job_title'], df['company']))
+        fresh = np.fromiter((key not in seen for key in keys), dtype=bool, count=len(keys))
+        seen.update(keys)
+        if not fresh.all():
+            metrics_logic.inc('rows_dropped', len(fresh) - int(fresh.sum()))
+            df = df.take(np.flatnonzero(fresh))
+        if not df.empty:
+            yield df
@@ -1,16 +1,128 @@
 # database_logic.py
 
+import argparse
+import atexit
+import hashlib
+import os
+import re
 import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+
+import metrics_logic
 
 DB_PATH = 'data/jobs.db'
+# How long a connection waits on a locked database before giving up
+BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+
+# Compiled statements each connection keeps for reuse; the hot queries run
+# through the same pooled connection over and over, so they are parsed once
+STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256'))
+
+# Each thread's pooled connections, {readonly: (conn, pid, generation)}, and
+# the one it has checked out at the moment
+_local = threading.local()
+# Bumped by setup_database, so connections pooled before a migration (or
+# before the file was recreated) are reopened on their next checkout
+_pool_generation = 0
+
+def get_connection(readonly=False):
+    """
+    Opens a new connection to DB_PATH with the pragmas every reader and
+    writer should run with. WAL itself is persistent and switched on by
+    setup_database, so readers never block behind the nightly writer. A
+    `readonly` connection is opened with mode=ro and refuses any write.
+    Most code should check a pooled one out with connection() instead.
+    """
+    if readonly:
+        conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -20000")
+    return conn
+
+def _pooled_connection(readonly):
+    """This thread's pooled connection of the given kind, (re)opened if it is missing or stale."""
+    pooled = getattr(_local, 'pooled', None)
+    if pooled is None:
+        pooled = _local.pooled = {}
+    entry = pooled.get(readonly)
+    if entry and entry[1:] == (os.getpid(), _pool_generation):
+        return entry[0]
+    # Close a stale one, unless it was inherited across fork: that one is the parent's
+    if entry and entry[1] == os.getpid():
+        entry[0].close()
+    conn = get_connection(readonly)
+    pooled[readonly] = (conn, os.getpid(), _pool_generation)
+    return conn
+
+@contextmanager
+def connection(readonly=False):
+    """
+    Checks out this thread's pooled connection, opening it on first use.
+    Checkouts nested inside another on the same thread get the outer
+    connection, so a web request that wraps its work in one
+    `with connection(readonly=True)` runs every query on it, and anything
+    that tries to write inside fails. A transaction still open when the
+    outermost checkout ends is rolled back.
+    """
+    if getattr(_local, 'depth', 0):
+        _local.depth += 1
+        try:
+            yield _local.active
+        finally:
+            _local.depth -= 1
+        return
+
+    conn = _pooled_connection(readonly)
+    _local.active, _local.depth = conn, 1
+    try:
+        yield conn
+    finally:
+        _local.active, _local.depth = None, 0
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Unusable now; the next checkout opens a fresh one
+            _local.pooled.pop(readonly, None)
+
+def close_connections():
+    """
+    Closes this thread's pooled connections. Runs at exit for the main
+    thread, so the last connection out checkpoints the WAL into jobs.db;
+    other threads' connections close with their thread.
+    """
+    for conn, pid, _ in getattr(_local, 'pooled', {}).values():
+        if pid == os.getpid():
+            conn.close()
+    _local.pooled = {}
+
+atexit.register(close_connections)
 
 def setup_database():
-    """Creates the database and the jobs table if they don't exist."""
+    """Creates the database if needed and applies any pending schema migrations."""
+    global _pool_generation
     print(f"Setting up database at {DB_PATH}...")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrate(conn)
+    finally:
+        conn.close()
+    _pool_generation += 1
+    print("Database and 'jobs' table are ready.")
+
+def _migration_1_base_schema(cursor):
+    """jobs keyed on slug, job_categories links and scrape_state high-water marks."""
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS jobs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -21,30 +133,660 @@ def setup_database():
             tags TEXT,
             normalized_title TEXT,
             category TEXT, -- New column for job type
-            scrape_run_date TIMESTAMP NOT NULL
+            scrape_run_date TIMESTAMP NOT NULL,
+            slug TEXT, -- RemoteOK's data-slug, unique per posting
+            first_seen TIMESTAMP,
+            last_seen TIMESTAMP
+        )
+    ''')
+    _ensure_column(cursor, 'jobs', 'slug', 'TEXT')
+    _ensure_column(cursor, 'jobs', 'first_seen', 'TIMESTAMP')
+    _ensure_column(cursor, 'jobs', 'last_seen', 'TIMESTAMP')
+    # A posting can be listed under several categories ('software', 'senior', ...)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_categories (
+            job_id INTEGER NOT NULL REFERENCES jobs(id),
+            category TEXT NOT NULL,
+            PRIMARY KEY (job_id, category)
+        )
+    ''')
+    if not _index_exists(cursor, 'idx_jobs_slug'):
+        _collapse_duplicate_jobs(cursor)
+        cursor.execute("CREATE UNIQUE INDEX idx_jobs_slug ON jobs(slug)")
+    # Newest posting seen per category, so daily runs only fetch the delta
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_state (
+            category TEXT PRIMARY KEY,
+            last_epoch INTEGER NOT NULL,
+            last_slug TEXT,
+            updated_at TIMESTAMP NOT NULL
         )
     ''')
-    conn.commit()
-    conn.close()
-    print("Database and 'jobs' table are ready.")
+
+def _migration_2_category_date_index(cursor):
+    """date_posted copied onto job_categories and an index on (category, date_posted)."""
+    _ensure_column(cursor, 'job_categories', 'date_posted', 'TIMESTAMP')
+    cursor.execute('''
+        UPDATE job_categories
+        SET date_posted = (SELECT j.date_posted FROM jobs j WHERE j.id = job_categories.job_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_job_categories_category_date
+        ON job_categories(category, date_posted, job_id)
+    ''')
+
+def _migration_3_tag_dictionary(cursor):
+    """tags dictionary and job_tags junction table, backfilled from jobs.tags."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_tags (
+            job_id INTEGER NOT NULL REFERENCES jobs(id),
+            tag_id INTEGER NOT NULL REFERENCES tags(id),
+            PRIMARY KEY (job_id, tag_id)
+        ) WITHOUT ROWID
+    ''')
+    rows = cursor.execute("SELECT id, tags FROM jobs WHERE tags IS NOT NULL AND tags != ''").fetchall()
+    pairs = [(job_id, name) for job_id, tag_str in rows for name in normalize_tags(tag_str.split(','))]
+    cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", sorted({(name,) for _, name in pairs}))
+    cursor.executemany("INSERT OR IGNORE INTO job_tags (job_id, tag_id) SELECT ?, id FROM tags WHERE name = ?", pairs)
+
+def _migration_4_rollups(cursor):
+    """daily category, daily tag and company rollup tables, built from existing data."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_category_counts (
+            category TEXT NOT NULL,
+            day TEXT NOT NULL,
+            job_count INTEGER NOT NULL,
+            PRIMARY KEY (category, day)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_tag_counts (
+            category TEXT NOT NULL,
+            day TEXT NOT NULL,
+            tag_id INTEGER NOT NULL REFERENCES tags(id),
+            mentions INTEGER NOT NULL,
+            PRIMARY KEY (category, day, tag_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS company_category_counts (
+            category TEXT NOT NULL,
+            company TEXT NOT NULL,
+            postings INTEGER NOT NULL,
+            PRIMARY KEY (category, company)
+        ) WITHOUT ROWID
+    ''')
+    _rebuild_rollups(cursor)
+
+def _migration_5_ingest_log(cursor):
+    """ingest_log of every store per category, used as the data version for caches."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            ingested_at TIMESTAMP NOT NULL,
+            row_count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingest_log_category ON ingest_log(category, id)")
+
+def _migration_6_report_tasks(cursor):
+    """report_tasks queue behind /generate, with at most one active task per category."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_tasks (
+            id TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            filename TEXT,
+            error TEXT,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+    ''')
+    # Coalesces identical requests: a second insert for a category with a task in flight fails
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_report_tasks_active ON report_tasks(category) WHERE active = 1")
+
+def _migration_7_llm_summaries(cursor):
+    """llm_summaries cache of generated report summaries, keyed on a hash of model and prompt."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_summaries (
+            prompt_hash TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+def _migration_8_content_hash(cursor):
+    """jobs.content_hash, so re-seen postings whose details haven't changed skip the rewrite."""
+    _ensure_column(cursor, 'jobs', 'content_hash', 'TEXT')
+
+def _migration_9_pipeline_runs(cursor):
+    """pipeline_runs and their per-category checkpoints, so an interrupted nightly run can resume."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            id TEXT PRIMARY KEY,
+            shard TEXT NOT NULL, -- 'k/n', or '1/1' for an unsharded run
+            full_scrape INTEGER NOT NULL,
+            status TEXT NOT NULL, -- running, done or failed
+            started_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_runs_shard ON pipeline_runs(shard, started_at)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_run_categories (
+            run_id TEXT NOT NULL REFERENCES pipeline_runs(id),
+            category TEXT NOT NULL,
+            status TEXT NOT NULL, -- done or failed
+            row_count INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (run_id, category)
+        ) WITHOUT ROWID
+    ''')
+
+# Applied in order; PRAGMA user_version records the last one a database has seen.
+MIGRATIONS = [
+    (1, _migration_1_base_schema),
+    (2, _migration_2_category_date_index),
+    (3, _migration_3_tag_dictionary),
+    (4, _migration_4_rollups),
+    (5, _migration_5_ingest_log),
+    (6, _migration_6_report_tasks),
+    (7, _migration_7_llm_summaries),
+    (8, _migration_8_content_hash),
+    (9, _migration_9_pipeline_runs),
+]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Applies every migration newer than the database's user_version, each in
+    its own transaction. BEGIN IMMEDIATE takes the write lock before the
+    version is re-read, so concurrent workers starting up can't apply the
+    same migration twice.
+    """
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for version, apply_migration in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if get_schema_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                print(f"Applying migration {version}: {apply_migration.__doc__}")
+                apply_migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+
+def _ensure_column(cursor, table, column, column_type):
+    """Adds `column` to `table` if an older database doesn't have it yet."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+def _index_exists(cursor, name):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone() is not None
+
+def _collapse_duplicate_jobs(cursor):
+    """
+    One-off upgrade of a database filled by the old append-only store_data,
+    which wrote every posting again on each scrape. Rows are grouped by slug,
+    or for rows from before slugs were stored by (title, company, posting
+    time). Each group's categories are linked to its newest row, which keeps
+    the group's first/last scrape dates, and the older duplicates are dropped.
+    """
+    # Every row's group in one sorted pass; no index on jobs exists yet, so
+    # per-row subqueries would scan the whole table once per row
+    cursor.execute("CREATE TEMP TABLE collapse_jobs (id INTEGER PRIMARY KEY, keep_id INTEGER, first_seen, last_seen)")
+    cursor.execute('''
+        INSERT INTO collapse_jobs (id, keep_id, first_seen, last_seen)
+        SELECT id, MAX(id) OVER w, MIN(scrape_run_date) OVER w, MAX(scrape_run_date) OVER w
+        FROM jobs WHERE slug IS NOT NULL
+        WINDOW w AS (PARTITION BY slug)
+    ''')
+    cursor.execute('''
+        INSERT INTO collapse_jobs (id, keep_id, first_seen, last_seen)
+        SELECT id, MAX(id) OVER w, MIN(scrape_run_date) OVER w, MAX(scrape_run_date) OVER w
+        FROM jobs WHERE slug IS NULL
+        WINDOW w AS (PARTITION BY job_title, company, date_posted)
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO job_categories (job_id, category)
+        SELECT c.keep_id, j.category FROM jobs j JOIN collapse_jobs c ON c.id = j.id
+        WHERE j.category IS NOT NULL
+    ''')
+    cursor.execute('''
+        UPDATE jobs SET
+            first_seen = (SELECT c.first_seen FROM collapse_jobs c WHERE c.id = jobs.id),
+            last_seen = (SELECT c.last_seen FROM collapse_jobs c WHERE c.id = jobs.id)
+        WHERE first_seen IS NULL
+    ''')
+    cursor.execute("DELETE FROM jobs WHERE id IN (SELECT id FROM collapse_jobs WHERE id != keep_id)")
+    if cursor.rowcount:
+        print(f"Collapsed {cursor.rowcount} duplicate job rows.")
+    cursor.execute("DROP TABLE collapse_jobs")
+
+def normalize_tags(tags_list):
+    """Strips and lowercases tags once at write time, dropping blanks and repeats."""
+    names = []
+    for tag in tags_list:
+        name = str(tag).strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def get_high_water_marks():
+    """Returns {category: (last_epoch, last_slug)} for every category scraped before."""
+    with connection() as conn:
+        rows = conn.execute("SELECT category, last_epoch, last_slug FROM scrape_state").fetchall()
+        return {category: (last_epoch, last_slug) for category, last_epoch, last_slug in rows}
+
+def update_high_water_marks(marks):
+    """Records the newest (epoch, slug) seen for each category in `marks`."""
+    if not marks:
+        return
+    now = datetime.now()
+    with connection() as conn:
+        with conn:
+            conn.executemany('''
+                INSERT INTO scrape_state (category, last_epoch, last_slug, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(category) DO UPDATE SET
+                    last_epoch = excluded.last_epoch,
+                    last_slug = excluded.last_slug,
+                    updated_at = excluded.updated_at
+                WHERE excluded.last_epoch >= scrape_state.last_epoch
+            ''', [(category, epoch, slug, now) for category, (epoch, slug) in marks.items()])
+
+def start_pipeline_run(shard, full):
+    """Records a new nightly run of `shard` ('k/n') and returns its id."""
+    run_id = uuid.uuid4().hex
+    now = datetime.now()
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                "INSERT INTO pipeline_runs (id, shard, full_scrape, status, started_at, updated_at) VALUES (?, ?, ?, 'running', ?, ?)",
+                (run_id, shard, int(full), now, now),
+            )
+    return run_id
+
+def find_resumable_run(shard, max_age_hours):
+    """
+    Returns (run_id, full, {category: status}) for the latest run of `shard`
+    that didn't finish cleanly, or None if its latest run completed or
+    started more than `max_age_hours` ago. Older runs are yesterday's: the
+    day's scrape starts over instead of only retrying what they left undone.
+    """
+    cutoff = datetime.now() - timedelta(hours=max_age_hours)
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT id, full_scrape, status FROM pipeline_runs WHERE shard = ? AND started_at >= ? ORDER BY started_at DESC LIMIT 1",
+            (shard, cutoff),
+        ).fetchone()
+        if row is None or row[2] == 'done':
+            return None
+        checkpoints = conn.execute(
+            "SELECT category, status FROM pipeline_run_categories WHERE run_id = ?", (row[0],)
+        ).fetchall()
+        return row[0], bool(row[1]), dict(checkpoints)
+
+def record_category_checkpoint(run_id, category, status, row_count=0, error=None):
+    """Marks `category` as done (its rows stored and high-water mark saved) or failed within run `run_id`."""
+    now = datetime.now()
+    with connection() as conn:
+        with conn:
+            conn.execute('''
+                INSERT INTO pipeline_run_categories (run_id, category, status, row_count, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run_id, category) DO UPDATE SET
+                    status = excluded.status,
+                    row_count = pipeline_run_categories.row_count + excluded.row_count,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+            ''', (run_id, category, status, row_count, error, now))
+            conn.execute("UPDATE pipeline_runs SET updated_at = ? WHERE id = ?", (now, run_id))
+        # Fold the WAL into jobs.db now rather than at exit: a run killed by the
+        # job's time limit must still leave every finished category in the file
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def finish_pipeline_run(run_id, status):
+    """Closes run `run_id` as 'done', or 'failed' so the next --resume picks it up again."""
+    with connection() as conn:
+        with conn:
+            conn.execute("UPDATE pipeline_runs SET status = ?, updated_at = ? WHERE id = ?", (status, datetime.now(), run_id))
+
+# Rollups: per-category counts that the dashboard and report read instead of
+# aggregating raw rows. Each statement aggregates the (job, category) links of
+# the jobs in a source set, multiplied by a sign, and adds the result onto the
+# rollup. store_data subtracts the old contribution of the jobs it is about to
+# touch and adds their new one, all inside the ingest transaction.
+_ROLLUP_SQL = [
+    '''
+    INSERT INTO daily_category_counts (category, day, job_count)
+    SELECT jc.category, date(jc.date_posted), ? * COUNT(*)
+    FROM job_categories jc {source}
+    WHERE jc.date_posted IS NOT NULL
+    GROUP BY jc.category, date(jc.date_posted)
+    ON CONFLICT(category, day) DO UPDATE SET job_count = job_count + excluded.job_count
+    ''',
+    '''
+    INSERT INTO daily_tag_counts (category, day, tag_id, mentions)
+    SELECT jc.category, date(jc.date_posted), jt.tag_id, ? * COUNT(*)
+    FROM job_categories jc {source} JOIN job_tags jt ON jt.job_id = jc.job_id
+    WHERE jc.date_posted IS NOT NULL
+    GROUP BY jc.category, date(jc.date_posted), jt.tag_id
+    ON CONFLICT(category, day, tag_id) DO UPDATE SET mentions = mentions + excluded.mentions
+    ''',
+    '''
+    INSERT INTO company_category_counts (category, company, postings)
+    SELECT jc.category, j.company, ? * COUNT(*)
+    FROM job_categories jc {source} JOIN jobs j ON j.id = jc.job_id
+    WHERE true
+    GROUP BY jc.category, j.company
+    ON CONFLICT(category, company) DO UPDATE SET postings = postings + excluded.postings
+    ''',
+]
+_ROLLUP_TABLES = ['daily_category_counts', 'daily_tag_counts', 'company_category_counts']
+_ROLLUP_COUNT_COLUMNS = ['job_count', 'mentions', 'postings']
+
+def _apply_rollups(cursor, sign, source=''):
+    """Adds `sign` times the contribution of the jobs joined in by `source` ('' = every job)."""
+    for statement in _ROLLUP_SQL:
+        cursor.execute(statement.format(source=source), (sign,))
+
+def _prune_rollups(cursor):
+    for table, column in zip(_ROLLUP_TABLES, _ROLLUP_COUNT_COLUMNS):
+        cursor.execute(f"DELETE FROM {table} WHERE {column} <= 0")
+
+def _rebuild_rollups(cursor):
+    for table in _ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+    _apply_rollups(cursor, 1)
+
+def rebuild_rollups():
+    """Recomputes every rollup table from the base tables, e.g. after a backfill."""
+    with connection() as conn:
+        with conn:
+            _rebuild_rollups(conn.cursor())
+        print("Rollup tables rebuilt.")
+
+_INGEST_SOURCE = "JOIN ingest_jobs b ON b.job_id = jc.job_id"
+_STAGE_INGEST_JOBS_SQL = "INSERT OR IGNORE INTO ingest_jobs (job_id) SELECT id FROM jobs WHERE slug = ?"
+
+UPSERT_JOB_SQL = '''
+    INSERT INTO jobs (slug, job_title, company, location, date_posted, tags, normalized_title,
+                      category, scrape_run_date, first_seen, last_seen, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(slug) DO UPDATE SET
+        job_title = excluded.job_title,
+        company = excluded.company,
+        location = excluded.location,
+        date_posted = excluded.date_posted,
+        tags = excluded.tags,
+        normalized_title = excluded.normalized_title,
+        scrape_run_date = excluded.scrape_run_date,
+        last_seen = excluded.last_seen,
+        content_hash = excluded.content_hash
+'''
+
+TOUCH_JOB_SQL = "UPDATE jobs SET last_seen = ? WHERE slug = ?"
+
+# Slugs looked up per query, well under SQLite's bound-parameter limit
+_LOOKUP_CHUNK = 500
+
+def _content_hash(*fields):
+    """Hash of a posting's stored details, compared on the next ingest to spot unchanged postings."""
+    return hashlib.sha1('\x1f'.join('' if field is None else str(field) for field in fields).encode()).hexdigest()
+
+def _stored_postings(cursor, slugs):
+    """Maps each already-stored slug among `slugs` to (content_hash, set of linked categories)."""
+    stored = {}
+    for start in range(0, len(slugs), _LOOKUP_CHUNK):
+        chunk = slugs[start:start + _LOOKUP_CHUNK]
+        rows = cursor.execute(f'''
+            SELECT j.slug, j.content_hash, jc.category
+            FROM jobs j LEFT JOIN job_categories jc ON jc.job_id = j.id
+            WHERE j.slug IN ({','.join('?' * len(chunk))})
+        ''', chunk)
+        for slug, content_hash, category in rows:
+            linked = stored.setdefault(slug, (content_hash, set()))[1]
+            if category:
+                linked.add(category)
+    return stored
+
+LINK_CATEGORY_SQL = '''
+    INSERT INTO job_categories (job_id, category, date_posted)
+    SELECT id, ?, date_posted FROM jobs WHERE slug = ?
+    ON CONFLICT(job_id, category) DO UPDATE SET date_posted = excluded.date_posted
+'''
+
+CLEAR_JOB_TAGS_SQL = "DELETE FROM job_tags WHERE job_id = (SELECT id FROM jobs WHERE slug = ?)"
+
+LINK_TAG_SQL = '''
+    INSERT OR IGNORE INTO job_tags (job_id, tag_id)
+    SELECT j.id, t.id FROM jobs j, tags t WHERE j.slug = ? AND t.name = ?
+'''
 
 def store_data(cleaned_df):
-    """Takes a cleaned DataFrame and inserts it into the SQLite database."""
+    """
+    Upserts a cleaned DataFrame into the SQLite database, keyed on the posting
+    slug: new postings are inserted, known ones get their details and
+    last_seen refreshed, each row's category (or every one in its
+    'categories' tuple, for frames with that column) is added to
+    job_categories and its normalized tags replace the ones in job_tags.
+    Known postings whose details are unchanged only have last_seen bumped
+    and any new categories linked, so a posting stored for one category and
+    seen again under another isn't rewritten. The rollup tables are updated
+    for exactly the postings that changed. Everything is written in one transaction. Returns the
+    number of rows stored (0 if nothing was written).
+    """
     if cleaned_df is None or cleaned_df.empty:
         print("No data to store in the database.")
-        return
+        return 0
+
+    df = cleaned_df[cleaned_df['slug'].notna()] if 'slug' in cleaned_df else cleaned_df.iloc[0:0]
+    if len(df) < len(cleaned_df):
+        print(f"Skipping {len(cleaned_df) - len(df)} job records without a slug.")
+    if df.empty:
+        return 0
 
-    df = cleaned_df.copy()
-    
-    df['scrape_run_date'] = datetime.now()
+    run_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    dates = pd.to_datetime(df['date_posted']).dt.strftime('%Y-%m-%d %H:%M:%S')
     # Convert list of tags to a comma-separated string for DB storage
-    df['tags'] = df['tags'].apply(lambda tags_list: ','.join(tags_list))
-    
-    conn = sqlite3.connect(DB_PATH)
+    tags = [','.join(tags_list) for tags_list in df['tags']]
+    if 'categories' in df:
+        memberships = [tuple(categories) for categories in df['categories']]
+    elif 'category' in df:
+        memberships = [(category,) if category else () for category in df['category']]
+    else:
+        memberships = [()] * len(df)
+    jobs = [
+        (slug, job_title, company, location, date_posted, tag_str, normalized_title,
+         categories[0] if categories else None,
+         _content_hash(job_title, company, location, date_posted, tag_str, normalized_title))
+        for slug, job_title, company, location, date_posted, tag_str, normalized_title, categories
+        in zip(df['slug'], df['job_title'], df['company'], df['location'], dates, tags,
+               df['normalized_title'], memberships)
+    ]
+    tag_lists = [normalize_tags(tags_list) for tags_list in df['tags']]
+
     try:
-        df.to_sql('jobs', conn, if_exists='append', index=False)
-        print(f"Successfully inserted/updated {len(df)} job records into the database.")
+        with connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS ingest_jobs (job_id INTEGER PRIMARY KEY)")
+            with metrics_logic.timer('db_insert'), conn:
+                cursor = conn.cursor()
+                # Take the write lock before looking at what is stored, so the
+                # comparison still holds when the writes below land
+                cursor.execute("BEGIN IMMEDIATE")
+                stored = _stored_postings(cursor, list(dict.fromkeys(df['slug'])))
+                job_rows, link_rows, tag_rows, touch_rows = [], [], [], []
+                relinked = 0
+                for job, categories, names in zip(jobs, memberships, tag_lists):
+                    slug, content_hash = job[0], job[-1]
+                    known = stored.get(slug)
+                    if known and known[0] == content_hash:
+                        touch_rows.append((run_date, slug))
+                        new_links = [(category, slug) for category in categories if category not in known[1]]
+                        link_rows.extend(new_links)
+                        relinked += bool(new_links)
+                        continue
+                    job_rows.append(job[:-1] + (run_date, run_date, run_date, content_hash))
+                    link_rows.extend((category, slug) for category in categories)
+                    tag_rows.extend((slug, name) for name in names)
+                slug_rows = [(slug,) for slug in dict.fromkeys(row[0] for row in job_rows)]
+                # Postings whose rollup contributions change: rewritten or linked to a new category
+                staged_rows = [(slug,) for slug in dict.fromkeys([row[0] for row in job_rows] + [slug for _, slug in link_rows])]
+                tag_names = sorted({name for _, name in tag_rows})
+
+                cursor.executemany(TOUCH_JOB_SQL, touch_rows)
+                if staged_rows:
+                    # Take the already-stored versions of these postings out of the rollups...
+                    cursor.execute("DELETE FROM ingest_jobs")
+                    cursor.executemany(_STAGE_INGEST_JOBS_SQL, staged_rows)
+                    _apply_rollups(cursor, -1, _INGEST_SOURCE)
+                    cursor.executemany(UPSERT_JOB_SQL, job_rows)
+                    cursor.executemany(LINK_CATEGORY_SQL, link_rows)
+                    cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in tag_names])
+                    cursor.executemany(CLEAR_JOB_TAGS_SQL, slug_rows)
+                    cursor.executemany(LINK_TAG_SQL, tag_rows)
+                    # ...and put the updated ones back in
+                    cursor.executemany(_STAGE_INGEST_JOBS_SQL, staged_rows)
+                    _apply_rollups(cursor, 1, _INGEST_SOURCE)
+                    _prune_rollups(cursor)
+                    # Every category linked to a staged posting had its rollups moved, including
+                    # ones outside this batch; unchanged postings don't bump any data version
+                    cursor.execute('''
+                        INSERT INTO ingest_log (category, ingested_at, row_count)
+                        SELECT jc.category, ?, COUNT(*) FROM job_categories jc JOIN ingest_jobs b ON b.job_id = jc.job_id
+                        GROUP BY jc.category
+                    ''', (run_date,))
+            metrics_logic.inc('rows_stored', len(job_rows))
+            metrics_logic.inc('rows_unchanged', len(touch_rows))
+            print(f"Successfully inserted/updated {len(job_rows)} job records into the database"
+                  f" ({len(touch_rows)} unchanged, {relinked} of them listed under a new category).")
+            return len(job_rows) + len(touch_rows)
     except Exception as e:
         print(f"An error occurred during data insertion: {e}")
-    finally:
-        conn.close()
\ No newline at end of file
+        return 0
+
+# The read queries behind /dashboard and the PDF report. They live here so
+# check_query_plans covers exactly what the app runs.
+CATEGORIES_QUERY = "SELECT DISTINCT category FROM daily_category_counts"
+DATA_VERSION_QUERY = "SELECT id, ingested_at FROM ingest_log WHERE category = ? ORDER BY id DESC LIMIT 1"
+CATEGORY_JOB_COUNT_QUERY = "SELECT COALESCE(SUM(job_count), 0) FROM daily_category_counts WHERE category = ?"
+TREND_QUERY = """
+    SELECT day AS post_date, job_count
+    FROM daily_category_counts WHERE category = ? AND day >= ?
+    ORDER BY day ASC
+"""
+TOP_SKILLS_QUERY = """
+    SELECT t.name AS tag, SUM(d.mentions) AS mentions
+    FROM daily_tag_counts d JOIN tags t ON t.id = d.tag_id
+    WHERE d.category = ?
+    GROUP BY d.tag_id ORDER BY mentions DESC, t.name LIMIT ?
+"""
+TOP_SKILLS_BETWEEN_QUERY = """
+    SELECT t.name AS tag, SUM(d.mentions) AS mentions
+    FROM daily_tag_counts d JOIN tags t ON t.id = d.tag_id
+    WHERE d.category = ? AND d.day >= ? AND d.day < ?
+    GROUP BY d.tag_id ORDER BY mentions DESC, t.name LIMIT ?
+"""
+TOP_COMPANIES_QUERY = """
+    SELECT company, postings FROM company_category_counts
+    WHERE category = ? AND postings > ?
+    ORDER BY postings DESC, company LIMIT ?
+"""
+
+def get_data_freshness(category):
+    """
+    Returns (id, time) of the latest ingest that touched `category`, or
+    (0, None) if there was none. The id only ever grows, so caches of derived
+    data can use it as their key.
+    """
+    with connection() as conn:
+        row = conn.execute(DATA_VERSION_QUERY, (category,)).fetchone()
+    if row is None:
+        return 0, None
+    return row[0], datetime.fromisoformat(row[1])
+
+def get_data_version(category):
+    return get_data_freshness(category)[0]
+
+HOT_QUERIES = {
+    'dashboard_categories': (CATEGORIES_QUERY, ()),
+    'dashboard_data_version': (DATA_VERSION_QUERY, ('software',)),
+    'dashboard_trend': (TREND_QUERY, ('software', '1970-01-01')),
+    'dashboard_skills': (TOP_SKILLS_BETWEEN_QUERY, ('software', '1970-01-01', '9999-12-31', 10)),
+    'report_job_count': (CATEGORY_JOB_COUNT_QUERY, ('software',)),
+    'report_top_skills': (TOP_SKILLS_QUERY, ('software', 10)),
+    'report_top_companies': (TOP_COMPANIES_QUERY, ('software', 1, 10)),
+}
+
+# A plan step like "SCAN jobs" (no index at all) means a full table scan.
+# SQLite before 3.36 prints it as "SCAN TABLE jobs", or "SCAN TABLE jobs AS j".
+_FULL_TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\S+)(?: AS \S+)?$')
+# Scanning daily_category_counts is fine: it holds one row per category per day.
+_SCANNABLE_TABLES = {'daily_category_counts'}
+
+def _is_full_table_scan(step):
+    """
+    Whether an EXPLAIN QUERY PLAN step reads a whole table without an index,
+    in either SQLite's old or new plan format.
+
+    >>> _is_full_table_scan('SCAN jobs'), _is_full_table_scan('SCAN TABLE jobs')
+    (True, True)
+    >>> _is_full_table_scan('SCAN TABLE jobs AS j'), _is_full_table_scan('SCAN TABLE daily_category_counts')
+    (True, False)
+    >>> _is_full_table_scan('SCAN jc USING INDEX idx_job_categories_category_date')
+    False
+    >>> _is_full_table_scan('SEARCH TABLE daily_tag_counts USING INDEX sqlite_autoindex_daily_tag_counts_1 (category=?)')
+    False
+    """
+    match = _FULL_TABLE_SCAN.match(step)
+    return bool(match) and match.group(1) not in _SCANNABLE_TABLES
+
+def check_query_plans():
+    """
+    Runs EXPLAIN QUERY PLAN for every query in HOT_QUERIES and prints the plan.
+    Returns {name: True/False} telling whether the query avoided full table scans.
+    """
+    results = {}
+    with connection() as conn:
+        for name, (query, params) in HOT_QUERIES.items():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+            results[name] = not any(_is_full_table_scan(step) for step in plan)
+            print(f"{'OK  ' if results[name] else 'SCAN'} {name}")
+            for step in plan:
+                print(f"       {step}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands for the jobs database.")
+    parser.add_argument('command', choices=['migrate', 'check-plans', 'rebuild-rollups'])
+    args = parser.parse_args()
+    if args.command == 'migrate':
+        setup_database()
+    elif args.command == 'check-plans':
+        setup_database()
+        if not all(check_query_plans().values()):
+            raise SystemExit(1)
+    elif args.command == 'rebuild-rollups':
+        setup_database()
+        rebuild_rollups()
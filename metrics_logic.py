@@ -0,0 +1,150 @@
+# metrics_logic.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Prefix of every metric name served on /metrics
+METRICS_PREFIX = 'jobscraper'
+# Where scheduled_scraper leaves the summary of its last run for /metrics to serve
+RUN_SUMMARY_PATH = os.getenv('METRICS_RUN_SUMMARY_PATH', 'data/last_run_metrics.json')
+
+# Timed stages and their help text. Only these names can be recorded, so a
+# typo fails loudly instead of quietly starting a new series.
+TIMERS = {
+    'browser_startup': 'Time to boot a headless Chrome session.',
+    'page_load': 'Time to fetch a listing page, over HTTP or in the browser up to the first job row.',
+    'scroll_iteration': 'Time per infinite-scroll step, including the wait for new rows.',
+    'parse': 'Time spent parsing job rows out of listing HTML.',
+    'clean': 'Time spent in clean_data.',
+    'db_insert': 'Time spent writing a batch of postings in store_data.',
+    'llm_request': 'Latency of an LLM summary request.',
+    'chart_render': 'Time to render a chart image.',
+    'pdf_render': 'Time to lay out and write a report PDF.',
+}
+COUNTERS = {
+    'rows_parsed': 'Job rows parsed out of listing pages.',
+    'rows_dropped': 'Parsed rows removed while cleaning (duplicates, promotions, bad dates).',
+    'rows_stored': 'Postings inserted or updated by store_data.',
+    'rows_unchanged': 'Postings store_data found unchanged and only marked as seen.',
+}
+
+# name -> [count, total seconds, max seconds] and name -> count, for this process
+_timers = {}
+_counters = {}
+_lock = threading.Lock()
+
+def observe(name, seconds):
+    """Records one `seconds` long run of the `name` stage."""
+    if name not in TIMERS:
+        raise KeyError(f"Unknown timer '{name}'")
+    with _lock:
+        timer = _timers.setdefault(name, [0, 0.0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+
+@contextmanager
+def timer(name):
+    """Times the body of the with block as one run of the `name` stage, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+def inc(name, value=1):
+    """Adds `value` to the `name` counter."""
+    if name not in COUNTERS:
+        raise KeyError(f"Unknown counter '{name}'")
+    if value:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+def snapshot():
+    """The metrics recorded by this process so far, as a JSON-friendly dict."""
+    with _lock:
+        return {
+            'timers': {name: {'count': count, 'seconds': round(total, 4), 'max_seconds': round(longest, 4)}
+                       for name, (count, total, longest) in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+def reset():
+    """Forgets everything recorded so far, e.g. at the start of a pipeline run."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+def format_summary(metrics):
+    """A snapshot() as printable lines, the slowest stage first."""
+    lines = [f"{'stage':<18} {'runs':>6} {'total s':>9} {'max s':>8}"]
+    for name, stats in sorted(metrics['timers'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"{name:<18} {stats['count']:>6} {stats['seconds']:>9.2f} {stats['max_seconds']:>8.2f}")
+    for name in COUNTERS:
+        if name in metrics['counters']:
+            lines.append(f"{name:<18} {metrics['counters'][name]:>6}")
+    return lines
+
+def write_run_summary(summary, path=RUN_SUMMARY_PATH):
+    """Saves a pipeline run's summary where /metrics picks it up, replacing the previous run's."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_run_summary(path=RUN_SUMMARY_PATH):
+    """The last run's summary written by write_run_summary, or None if there isn't a readable one."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _metric(name):
+    return f'{METRICS_PREFIX}_{name}'
+
+def _help(lines, name, kind, text):
+    lines.append(f'# HELP {name} {text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+def render_prometheus():
+    """
+    This process's metrics, followed by the last pipeline run's summary, in
+    the Prometheus text exposition format. Each web worker process keeps its
+    own counts; the nightly pipeline runs in a process of its own, so its
+    numbers are served from the summary file it writes.
+    """
+    metrics = snapshot()
+    lines = []
+    for name, text in TIMERS.items():
+        stats = metrics['timers'].get(name, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        _help(lines, _metric(f'{name}_seconds'), 'summary', text)
+        lines.append(f'{_metric(name)}_seconds_count {stats["count"]}')
+        lines.append(f'{_metric(name)}_seconds_sum {stats["seconds"]}')
+        _help(lines, _metric(f'{name}_max_seconds'), 'gauge', f'Longest single run. {text}')
+        lines.append(f'{_metric(name)}_max_seconds {stats["max_seconds"]}')
+    for name, text in COUNTERS.items():
+        _help(lines, _metric(f'{name}_total'), 'counter', text)
+        lines.append(f'{_metric(name)}_total {metrics["counters"].get(name, 0)}')
+
+    summary = load_run_summary()
+    if summary:
+        finished = datetime.fromisoformat(summary['finished_at']).timestamp()
+        _help(lines, _metric('last_run_timestamp_seconds'), 'gauge', 'When the last pipeline run finished.')
+        lines.append(f'{_metric("last_run_timestamp_seconds")} {finished}')
+        _help(lines, _metric('last_run_duration_seconds'), 'gauge', 'Wall time of the last pipeline run.')
+        lines.append(f'{_metric("last_run_duration_seconds")} {summary["wall_seconds"]}')
+        _help(lines, _metric('last_run_stage_seconds'), 'gauge', 'Time the last pipeline run spent in each stage.')
+        for name, stats in summary['metrics']['timers'].items():
+            lines.append(f'{_metric("last_run_stage_seconds")}{{stage="{name}"}} {stats["seconds"]}')
+        _help(lines, _metric('last_run_rows'), 'gauge', 'Rows the last pipeline run parsed, dropped, stored and found unchanged.')
+        for name, count in summary['metrics']['counters'].items():
+            lines.append(f'{_metric("last_run_rows")}{{kind="{name.removeprefix("rows_")}"}} {count}')
+        _help(lines, _metric('last_run_failed_categories'), 'gauge', 'Categories that failed in the last pipeline run.')
+        lines.append(f'{_metric("last_run_failed_categories")} {len(summary.get("failed_categories", []))}')
+    return '\n'.join(lines) + '\n'
@@ -1,38 +1,77 @@
 # reporter_logic.py (Updated for OpenRouter)
 
-import sqlite3
 import pandas as pd
 from datetime import datetime
-import matplotlib
-
-import matplotlib.pyplot as plt
-import seaborn as sns
-from fpdf import FPDF
+import asyncio
+import glob
+import hashlib
 import os
+import threading
+import time
+
+# The plotting, PDF and OpenAI libraries take seconds to import, so they are
+# only loaded once a report or summary actually has to be generated; a
+# cached report needs none of them.
 
-# <<< CHANGE 1: Import the OpenAI library >>>
-# We still use the official 'openai' library
-from openai import OpenAI
+import metrics_logic
+from chart_logic import _new_figure
+from database_logic import CATEGORY_JOB_COUNT_QUERY, DATA_VERSION_QUERY, TOP_COMPANIES_QUERY, TOP_SKILLS_QUERY, connection
 
 # --- Configuration ---
-DB_PATH = 'data/jobs.db'
 REPORTS_DIR = 'reports'
-matplotlib.use('Agg')
+# A report is served again for this long as long as the data behind it hasn't changed
+REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', str(24 * 3600)))
+# Oldest reports are deleted once REPORTS_DIR grows past this many bytes
+REPORTS_MAX_BYTES = int(os.getenv('REPORTS_MAX_BYTES', str(200 * 1024 * 1024)))
 
 # <<< CHANGE 2: Your OpenRouter API Key >>>
 # For a real project, use environment variables: os.getenv("OPENROUTER_API_KEY")
 # NEVER commit your API key to a public Git repository if it's not a free one.
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-# <<< CHANGE 3: Create a dedicated OpenAI client configured for OpenRouter >>>
-client = OpenAI(
-  base_url="https://openrouter.ai/api/v1",
-  api_key=OPENROUTER_API_KEY,
-  default_headers={ # Optional, but recommended for identifying your app
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_HEADERS = { # Optional, but recommended for identifying your app
     # "HTTP-Referer": "https://github.com/your-repo-name", # Replace with your project URL
     "X-Title": "Remote Job Scraper", # Replace with your project name
-  },
-)
+}
+
+LLM_MODEL = os.getenv('LLM_MODEL', "openai/gpt-oss-120b:free")
+# 'openrouter', or 'stub' for a canned summary that needs no network or API key
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openrouter')
+# Seconds one attempt may take, and how many more attempts the client makes after that
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+# Requests in flight at once when several categories are summarized together
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+# Simulated response time of the stub backend, for benchmarking the pipeline offline
+LLM_STUB_LATENCY = float(os.getenv('LLM_STUB_LATENCY', '0'))
+SUMMARY_UNAVAILABLE = "Summary could not be generated due to an error."
+
+_client = None
+_client_lock = threading.Lock()
+
+def _get_client():
+    """The OpenAI client configured for OpenRouter, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # <<< CHANGE 1: Import the OpenAI library >>>
+            # We still use the official 'openai' library
+            from openai import OpenAI
+            # <<< CHANGE 3: Create a dedicated OpenAI client configured for OpenRouter >>>
+            _client = OpenAI(
+              base_url=OPENROUTER_BASE_URL,
+              api_key=OPENROUTER_API_KEY,
+              default_headers=OPENROUTER_HEADERS,
+              timeout=LLM_TIMEOUT,
+              max_retries=LLM_MAX_RETRIES,
+            )
+        return _client
+
+def _plotting():
+    """seaborn and FPDF, imported on first use."""
+    import seaborn as sns
+    from fpdf import FPDF
+    return sns, FPDF
 
 # def _fetch_data_by_category(category):
 #     # This function does not need to change
@@ -154,71 +193,250 @@ client = OpenAI(
 #     return pdf_report_path
 
 
-def _fetch_data_by_category(category):
-    # This function is correct
-    conn = sqlite3.connect(DB_PATH)
-    query = "SELECT * FROM jobs WHERE category = ?"
-    try:
-        df = pd.read_sql_query(query, conn, params=(category,))
-        df['date_posted'] = pd.to_datetime(df['date_posted'])
-        print(f"Fetched {len(df)} records for category '{category}'.")
-        return df
-    finally:
-        conn.close()
-
-def get_llm_summary(category, top_skills, top_companies):
+def _fetch_category_summary(category, limit=10):
+    """
+    Reads the report's inputs from the rollup tables: the number of postings,
+    the most mentioned skills and the companies hiring for more than one role.
+    """
+    with connection() as conn:
+        job_count = conn.execute(CATEGORY_JOB_COUNT_QUERY, (category,)).fetchone()[0]
+        skills_df = pd.read_sql_query(TOP_SKILLS_QUERY, conn, params=(category, limit))
+        companies_df = pd.read_sql_query(TOP_COMPANIES_QUERY, conn, params=(category, 1, limit))
+        print(f"Fetched summary of {job_count} records for category '{category}'.")
+        top_skills = pd.Series(skills_df['mentions'].values, index=skills_df['tag'], name='count')
+        top_companies = pd.Series(companies_df['postings'].values, index=companies_df['company'], name='count')
+        return job_count, top_skills, top_companies
+
+def _build_prompt(category, top_skills, top_companies):
     skills_str = "\n".join([f"- {skill}: {count} listings" for skill, count in top_skills.items()])
     companies_str = "\n".join([f"- {company}: {count} listings" for company, count in top_companies.items()])
 
-    prompt = f"""
+    return f"""
     You are a data analyst writing a summary for a weekly job market report. The report is for the job category: "{category.title()}".
     Based ONLY on the data provided (Top Skills: {skills_str}; Top Companies: {companies_str}), write a concise, professional, 2-3 sentence summary of the key hiring trends.
     Start with a sentence like "In the {category.title()} sector this week...". Do not add any information not present in the data.
     """
 
+def _chat_request(prompt):
+    return dict(
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful data analyst."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.5,
+        # <<< CHANGE 1: Increase the token limit to prevent truncation >>>
+        max_tokens=250
+    )
+
+def _stub_summary(category):
+    return f"In the {category.title()} sector this week, hiring activity was summarized offline by the stub LLM backend."
+
+def _prompt_hash(prompt):
+    """Cache key for a summary: the same prompt sent to the same model gets the same answer."""
+    return hashlib.sha256(f"{LLM_BACKEND}\n{LLM_MODEL}\n{prompt}".encode('utf-8')).hexdigest()
+
+def _load_summaries(prompt_hashes):
+    """Returns {prompt_hash: summary} for the hashes already in the llm_summaries cache."""
+    if not prompt_hashes:
+        return {}
+    placeholders = ', '.join('?' * len(prompt_hashes))
+    with connection() as conn:
+        rows = conn.execute(
+            f"SELECT prompt_hash, summary FROM llm_summaries WHERE prompt_hash IN ({placeholders})",
+            list(prompt_hashes),
+        ).fetchall()
+    return dict(rows)
+
+def _save_summaries(summaries):
+    """Stores {prompt_hash: summary}. Failures are never stored, so they are retried next time."""
+    if not summaries:
+        return
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    with connection() as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO llm_summaries (prompt_hash, model, summary, created_at) VALUES (?, ?, ?, ?)",
+                [(prompt_hash, LLM_MODEL, summary, now) for prompt_hash, summary in summaries.items()],
+            )
+
+def get_llm_summary(category, top_skills, top_companies):
+    prompt = _build_prompt(category, top_skills, top_companies)
+    prompt_hash = _prompt_hash(prompt)
+    cached = _load_summaries([prompt_hash])
+    if prompt_hash in cached:
+        print(f"Reusing cached LLM summary for '{category}'.")
+        return cached[prompt_hash]
+
     print("Generating LLM summary via OpenRouter...")
     try:
-        response = client.chat.completions.create(
-            model="openai/gpt-oss-120b:free", 
-            messages=[
-                {"role": "system", "content": "You are a helpful data analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            # <<< CHANGE 1: Increase the token limit to prevent truncation >>>
-            max_tokens=250 
-        )
-        summary = response.choices[0].message.content.strip()
+        with metrics_logic.timer('llm_request'):
+            if LLM_BACKEND == 'stub':
+                time.sleep(LLM_STUB_LATENCY)
+                summary = _stub_summary(category)
+            else:
+                response = _get_client().chat.completions.create(**_chat_request(prompt))
+                summary = response.choices[0].message.content.strip()
         print("LLM summary generated successfully.")
-        return summary
     except Exception as e:
         print(f"Error generating LLM summary via OpenRouter: {e}")
-        return "Summary could not be generated due to an error."
+        return SUMMARY_UNAVAILABLE
+    _save_summaries({prompt_hash: summary})
+    return summary
+
+async def _summarize_async(pending):
+    """
+    Sends {prompt_hash: (category, prompt)} to the LLM concurrently, at most
+    LLM_CONCURRENCY at a time, and returns {prompt_hash: summary} for the
+    requests that succeeded within their timeout and retries.
+    """
+    semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+    async_client = None
+    if LLM_BACKEND != 'stub':
+        from openai import AsyncOpenAI
+        async_client = AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL,
+            api_key=OPENROUTER_API_KEY,
+            default_headers=OPENROUTER_HEADERS,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+        )
+
+    async def summarize(prompt_hash, category, prompt):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if async_client is None:
+                    await asyncio.sleep(LLM_STUB_LATENCY)
+                    return prompt_hash, _stub_summary(category)
+                response = await async_client.chat.completions.create(**_chat_request(prompt))
+                return prompt_hash, response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"Error generating LLM summary for '{category}': {e}")
+                return prompt_hash, None
+            finally:
+                metrics_logic.observe('llm_request', time.perf_counter() - started)
+
+    try:
+        results = await asyncio.gather(*(summarize(h, category, prompt) for h, (category, prompt) in pending.items()))
+    finally:
+        if async_client is not None:
+            await async_client.close()
+    return {prompt_hash: summary for prompt_hash, summary in results if summary is not None}
+
+def summarize_categories(categories):
+    """
+    Generates the LLM summary of every category in one batch and returns
+    {category: summary}. Cached summaries are reused and the rest are
+    requested concurrently instead of one blocking call after another, so
+    generate_report finds them all in the cache afterwards.
+    """
+    prompts = {}
+    for category in categories:
+        job_count, top_skills, top_companies = _fetch_category_summary(category)
+        if job_count:
+            prompts[category] = _build_prompt(category, top_skills, top_companies)
+
+    hashes = {category: _prompt_hash(prompt) for category, prompt in prompts.items()}
+    summaries = _load_summaries(set(hashes.values()))
+    pending = {prompt_hash: (category, prompts[category]) for category, prompt_hash in hashes.items()
+               if prompt_hash not in summaries}
+    print(f"Summarizing {len(prompts)} categories: {len(prompts) - len(pending)} cached, {len(pending)} to generate.")
+
+    if pending:
+        generated = asyncio.run(_summarize_async(pending))
+        _save_summaries(generated)
+        summaries.update(generated)
+    return {category: summaries.get(prompt_hash, SUMMARY_UNAVAILABLE) for category, prompt_hash in hashes.items()}
+
+def _report_fingerprint(category):
+    """(job count, latest ingest id) for `category`; reports built from the same pair are identical."""
+    with connection() as conn:
+        job_count = conn.execute(CATEGORY_JOB_COUNT_QUERY, (category,)).fetchone()[0]
+        row = conn.execute(DATA_VERSION_QUERY, (category,)).fetchone()
+    return job_count, row[0] if row else 0
+
+def _report_path(category, fingerprint):
+    job_count, version = fingerprint
+    return os.path.join(REPORTS_DIR, f'{category}_report_v{version}_{job_count}.pdf')
+
+def _is_fresh(path):
+    try:
+        return time.time() - os.path.getmtime(path) < REPORT_CACHE_TTL
+    except OSError:
+        return False
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _evict_reports(keep_path):
+    """
+    Deletes superseded reports for the same category, then the oldest other
+    reports until REPORTS_DIR fits in REPORTS_MAX_BYTES. `keep_path` is
+    never removed.
+    """
+    prefix = keep_path.rsplit('_report_', 1)[0]
+    for old_path in glob.glob(f'{glob.escape(prefix)}_report_*.pdf'):
+        if old_path != keep_path:
+            _remove_file(old_path)
+
+    reports = []
+    for path in glob.glob(os.path.join(REPORTS_DIR, '*.pdf')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        reports.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in reports)
+    for _, size, path in sorted(reports):
+        if total <= REPORTS_MAX_BYTES:
+            break
+        if path != keep_path:
+            _remove_file(path)
+            total -= size
+            print(f"Evicted report {path} to keep {REPORTS_DIR}/ under {REPORTS_MAX_BYTES} bytes.")
 
 def generate_report(category):
-    df = _fetch_data_by_category(category)
-    if df.empty: return None
+    """
+    Builds the PDF report for `category` and returns its path, or None if
+    there are no jobs for it. Reports are named after the category's data
+    fingerprint, so while nothing new has been stored and the file is younger
+    than REPORT_CACHE_TTL the existing PDF is returned without touching the
+    LLM or matplotlib.
+    """
+    fingerprint = _report_fingerprint(category)
+    if not fingerprint[0]: return None
+
+    pdf_report_path = _report_path(category, fingerprint)
+    if _is_fresh(pdf_report_path):
+        print(f"Reusing cached report for '{category}' at {pdf_report_path}")
+        return pdf_report_path
 
-    df['tags'] = df['tags'].str.split(',')
-    all_skills = df.explode('tags')['tags'].str.strip().str.lower()
-    all_skills = all_skills[all_skills != '']
-    top_10_skills = all_skills.value_counts().head(10)
-    top_hiring_companies = df['company'].value_counts().loc[lambda x: x > 1].head(10)
+    job_count, top_10_skills, top_hiring_companies = _fetch_category_summary(category)
+    if not job_count: return None
 
     llm_summary = get_llm_summary(category, top_10_skills, top_hiring_companies)
+    if llm_summary == SUMMARY_UNAVAILABLE:
+        # Don't let the report cache serve a report without its summary until the data changes
+        pdf_report_path = pdf_report_path.replace('.pdf', '_partial.pdf')
 
-    report_date = datetime.now().strftime('%Y%m%d')
-    pdf_report_path = os.path.join(REPORTS_DIR, f'{category}_report_{report_date}.pdf')
     plot_skills_path = os.path.join(REPORTS_DIR, f'{category}_top_skills.png')
-
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=top_10_skills.values, y=top_10_skills.index, hue=top_10_skills.index, palette='viridis', legend=False)
-    plt.title(f'Top 10 Most Demanded Skills for {category.title()} Roles', fontsize=16)
-    plt.xlabel('Number of Job Postings', fontsize=12)
-    plt.tight_layout()
-    plt.savefig(plot_skills_path)
-    plt.close()
-
+    sns, FPDF = _plotting()
+
+    with metrics_logic.timer('chart_render'):
+        # A Figure of its own, not pyplot's current one: report tasks run on several threads at once
+        fig = _new_figure((10, 6))
+        ax = fig.subplots()
+        sns.barplot(x=top_10_skills.values, y=top_10_skills.index, hue=top_10_skills.index, palette='viridis', legend=False, ax=ax)
+        ax.set_title(f'Top 10 Most Demanded Skills for {category.title()} Roles', fontsize=16)
+        ax.set_xlabel('Number of Job Postings', fontsize=12)
+        fig.tight_layout()
+        fig.savefig(plot_skills_path)
+
+    pdf_started = time.perf_counter()
     pdf = FPDF()
     pdf.add_page()
     pdf.add_font('DejaVu', '', 'fonts/DejaVuSans.ttf', uni=True)
@@ -250,7 +468,15 @@ def generate_report(category):
             # <<< CHANGE 3: Also remove sanitization from company names >>>
             pdf.cell(0, 8, f"- {company}: {count} positions", 0, 1)
 
-    pdf.output(pdf_report_path)
+    # Write under a temp name so a concurrent download never sees a half-written PDF
+    tmp_report_path = f'{pdf_report_path}.{os.getpid()}.tmp'
+    try:
+        pdf.output(tmp_report_path)
+        os.replace(tmp_report_path, pdf_report_path)
+    finally:
+        _remove_file(tmp_report_path)
+    metrics_logic.observe('pdf_render', time.perf_counter() - pdf_started)
     print(f"PDF report generated successfully at {pdf_report_path}")
+    _evict_reports(pdf_report_path)
     
     return pdf_report_path
\ No newline at end of file
@@ -1,10 +1,19 @@
 # scheduled_scraper.py
 
-import pandas as pd
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
 
-from scraper_logic import run_scraper
-from cleaner_logic import clean_data
-from database_logic import setup_database, store_data
+from scraper_logic import DriverPool, run_scraper, shutdown_parse_pool, stream_jobs
+from cleaner_logic import clean_batches, clean_data
+from database_logic import (
+    find_resumable_run, finish_pipeline_run, get_high_water_marks, record_category_checkpoint,
+    setup_database, start_pipeline_run, store_data, update_high_water_marks,
+)
+import metrics_logic
 
 JOB_CATEGORIES = {
     'support': 'remote-support-jobs',
@@ -21,41 +30,294 @@ JOB_CATEGORIES = {
     'security': 'remote-security-jobs'
 }
 
-def run_daily_pipeline():
+# Number of categories scraped concurrently, each holding one pooled browser.
+DEFAULT_WORKERS = int(os.getenv('SCRAPER_WORKERS', '1'))
+# Jobs cleaned and written per transaction in --stream mode
+STREAM_BATCH_SIZE = int(os.getenv('SCRAPER_BATCH_SIZE', '500'))
+# --resume only continues runs started this recently; the nightly cron passes
+# it every day, and an older unfinished run must not cut tonight's scrape short
+RESUME_MAX_AGE_HOURS = float(os.getenv('RESUME_MAX_AGE_HOURS', '12'))
+
+# Archiving is only reported on failure, never fails a category: the database already has the jobs
+
+def _archive(cleaned_df):
+    """Copies a stored category into the Parquet archive."""
+    try:
+        from archive_logic import archive_jobs
+        archive_jobs(cleaned_df)
+    except Exception as e:
+        print(f"Could not archive {len(cleaned_df)} jobs: {e}")
+
+def _open_archive(category_name):
+    """A CategoryArchive collecting a streamed category's batches into one file, or None if archiving is unavailable."""
+    try:
+        from archive_logic import CategoryArchive
+        return CategoryArchive(category_name)
+    except Exception as e:
+        print(f"Could not archive '{category_name}': {e}")
+        return None
+
+def _archive_batch(archive, cleaned_df):
+    """Appends a stored batch to `archive`. Returns the archive, or None once it has failed."""
+    try:
+        archive.write(cleaned_df)
+        return archive
+    except Exception as e:
+        print(f"Could not archive '{archive.category}', skipping the rest of it: {e}")
+        _close_archive(archive)
+        return None
+
+def _close_archive(archive):
+    try:
+        archive.close()
+    except Exception as e:
+        print(f"Could not finish the archive of '{archive.category}': {e}")
+
+def _scrape_category(category_name, url_slug, pool, high_water_mark=None):
+    """
+    Scrapes and cleans a single category, borrowing a browser from `pool`
+    only if the HTTP backend can't serve it. Given the category's
+    `high_water_mark` from the last run, only newer postings are scraped.
+    Never raises, so one broken category can't take down the whole run.
+    Returns a result dict with the cleaned DataFrame (or None), elapsed
+    seconds, the scraper's fetch stats, the new high-water mark and an
+    error message (or None).
+    """
+    scrape_url = f"https://remoteok.com/{url_slug}"
+    result = {'category': category_name, 'df': None, 'rows': 0, 'elapsed': 0.0, 'stats': {},
+              'high_water_mark': None, 'error': None}
+    started = time.perf_counter()
+    print(f"\n--- Scraping Category: {category_name} ---")
+    try:
+        raw_df = run_scraper(scrape_url, pool=pool, high_water_mark=high_water_mark)
+        if raw_df is None:
+            result['error'] = "scrape failed"
+        else:
+            result['stats'] = raw_df.attrs.get('scrape_stats', {})
+            result['high_water_mark'] = raw_df.attrs.get('high_water_mark')
+            if not raw_df.empty:
+                # Add the category to each job listing
+                cleaned_df = clean_data(raw_df, category=category_name)
+                result['df'] = cleaned_df
+                result['rows'] = len(cleaned_df)
+    except Exception as e:
+        print(f"Category '{category_name}' failed: {e}")
+        result['error'] = str(e)
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _stream_category(category_name, url_slug, pool, high_water_mark=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streaming counterpart of _scrape_category: parsed jobs flow from the
+    scraper through clean_batches into store_data `batch_size` at a time, so
+    memory is bounded by the batch rather than the category, and the first
+    rows are in the database while the rest are still being fetched. The
+    category's high-water mark is saved as soon as all of its batches are
+    stored. Never raises; returns the same result dict with 'df' left None.
+    """
+    scrape_url = f"https://remoteok.com/{url_slug}"
+    result = {'category': category_name, 'df': None, 'rows': 0, 'elapsed': 0.0, 'stats': {},
+              'high_water_mark': None, 'error': None}
+    started = time.perf_counter()
+    print(f"\n--- Streaming Category: {category_name} ---")
+    meta = {}
+    archive = _open_archive(category_name)
+    try:
+        jobs = stream_jobs(scrape_url, pool=pool, high_water_mark=high_water_mark, meta=meta)
+        for cleaned_df in clean_batches(_batched(jobs, batch_size), category=category_name):
+            if not store_data(cleaned_df):
+                raise RuntimeError(f"storing a batch of {len(cleaned_df)} jobs failed")
+            if archive:
+                archive = _archive_batch(archive, cleaned_df)
+            result['rows'] += len(cleaned_df)
+        result['stats'] = meta.get('scrape_stats', {})
+        result['high_water_mark'] = meta.get('high_water_mark')
+        if result['high_water_mark']:
+            update_high_water_marks({category_name: result['high_water_mark']})
+    except Exception as e:
+        print(f"Category '{category_name}' failed: {e}")
+        result['error'] = str(e)
+    if archive:
+        # The batches stored before a failure are archived too
+        _close_archive(archive)
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+def _checkpoint_category(run_id, category_name, url_slug, pool, high_water_mark=None, stream=False):
+    """
+    Scrapes one category and persists it before returning: its jobs are
+    stored, its high-water mark saved and the category checkpointed as done
+    in run `run_id` (or as failed), so a crash later in the run loses nothing
+    this category has already fetched. Never raises; returns the result dict.
+    """
+    if stream:
+        result = _stream_category(category_name, url_slug, pool, high_water_mark)
+    else:
+        result = _scrape_category(category_name, url_slug, pool, high_water_mark)
+        if not result['error'] and result['df'] is not None and not store_data(result['df']):
+            result['error'] = "storing failed"
+        elif not result['error']:
+            if result['df'] is not None:
+                _archive(result['df'])
+            if result['high_water_mark']:
+                # Only move the mark forward once the postings below it are safely stored
+                update_high_water_marks({category_name: result['high_water_mark']})
+        # Stored; don't keep every category's frame alive until the end of the run
+        result['df'] = None
+    try:
+        record_category_checkpoint(run_id, category_name, 'failed' if result['error'] else 'done',
+                                   result['rows'], result['error'])
+    except Exception as e:
+        print(f"Could not checkpoint category '{category_name}': {e}")
+    return result
+
+def shard_categories(categories, shard):
+    """The part of `categories` that shard (k, n) covers: every n-th category, starting with the k-th."""
+    index, count = shard
+    return dict(list(categories.items())[index - 1::count])
+
+def _print_timings(results, wall_time):
+    print("\n--- Per-Category Timings ---")
+    for result in results:
+        rows = result['rows']
+        status = f"FAILED ({result['error']})" if result['error'] else f"{rows} jobs"
+        stats = result['stats']
+        if 'scroll_iterations' in stats:
+            status += f", {stats['scroll_iterations']} scrolls / {stats['scroll_wait_seconds']}s waiting"
+        elif 'http_requests' in stats:
+            status += f", {stats['http_requests']} HTTP request(s)"
+        print(f"{result['category']:<12} {result['elapsed']:7.1f}s  {status}")
+    print(f"{'total':<12} {wall_time:7.1f}s wall time")
+
+def _write_run_summary(results, started_at, wall_time, run_id=None, shard='1/1'):
+    """Prints where the run's time went and saves it for the web app's /metrics."""
+    metrics = metrics_logic.snapshot()
+    print("\n--- Run Metrics ---")
+    for line in metrics_logic.format_summary(metrics):
+        print(line)
+    summary = {
+        'run_id': run_id,
+        'shard': shard,
+        'started_at': started_at.isoformat(),
+        'finished_at': datetime.now().isoformat(),
+        'wall_seconds': round(wall_time, 2),
+        'categories': {result['category']: {'rows': result['rows'], 'seconds': round(result['elapsed'], 2)}
+                       for result in results},
+        'failed_categories': [result['category'] for result in results if result['error']],
+        'metrics': metrics,
+    }
+    try:
+        metrics_logic.write_run_summary(summary)
+    except OSError as e:
+        print(f"Could not save the run metrics: {e}")
+
+def _generate_reports(categories):
+    """Builds the PDF report of every category, asking the LLM for all missing summaries in one concurrent batch."""
+    print(f"\n--- Generating reports for {len(categories)} categories ---")
+    # Imported here so scrape-only runs don't need the LLM client configured
+    from reporter_logic import generate_report, summarize_categories
+    summarize_categories(categories)
+    for category in categories:
+        try:
+            generate_report(category)
+        except Exception as e:
+            print(f"Failed to generate the report for '{category}': {e}")
+
+def run_daily_pipeline(workers=DEFAULT_WORKERS, full=False, reports=False, stream=False, shard=(1, 1), resume=False):
     """
     Main function to run the entire data collection pipeline for all categories.
+    With workers > 1, categories are scraped concurrently over a pool of that
+    many long-lived browser sessions. Each category is scraped incrementally
+    up to the newest posting stored by the previous run, unless `full` is set.
+    Every category is stored and checkpointed as soon as it is scraped; with
+    `resume`, an interrupted run of the same shard started within the last
+    RESUME_MAX_AGE_HOURS is picked up again and only the categories it
+    hadn't finished are scraped.
+    `shard` = (k, n) limits the run to the k-th of n slices of the category
+    list, so n processes can cover it side by side.
+    With `reports`, a PDF report is built for every category afterwards.
+    With `stream`, each category is written to the database in batches while
+    it is being scraped instead of in one store once it is done.
     """
     print("--- Starting Daily Scraping Pipeline ---")
+    metrics_logic.reset()
+    run_started_at, run_started = datetime.now(), time.perf_counter()
     
     setup_database()
+    shard_label = f'{shard[0]}/{shard[1]}'
+    categories = shard_categories(JOB_CATEGORIES, shard)
+    resumable = find_resumable_run(shard_label, RESUME_MAX_AGE_HOURS)
+    if resume and resumable:
+        run_id, full, checkpoints = resumable
+        pending = {name: slug for name, slug in categories.items() if checkpoints.get(name) != 'done'}
+        print(f"Resuming run {run_id}: {len(categories) - len(pending)} of {len(categories)} categories already done.")
+    else:
+        if resumable:
+            print(f"Run {resumable[0]} of shard {shard_label} did not finish; pass --resume to continue it instead.")
+        run_id = start_pipeline_run(shard_label, full)
+        pending = categories
+    marks = {} if full else get_high_water_marks()
     
-    all_new_jobs = []
-
-    # Loop through each category, scrape, and clean the data
-    for category_name, url_slug in JOB_CATEGORIES.items():
-        scrape_url = f"https://remoteok.com/{url_slug}"
-        
-        print(f"\n--- Scraping Category: {category_name} ---")
-        raw_df = run_scraper(scrape_url)
-        
-        if raw_df is not None and not raw_df.empty:
-            cleaned_df = clean_data(raw_df)
-            # Add the category to each job listing
-            cleaned_df['category'] = category_name
-            all_new_jobs.append(cleaned_df)
-    
-    if not all_new_jobs:
-        print("No new jobs found across all categories. Exiting.")
-        return
+    workers = max(1, min(workers, len(pending)))
+    print(f"Scraping {len(pending)} categories (shard {shard_label}) with {workers} worker(s).")
 
-    # Combine all cleaned dataframes into one
-    final_df = pd.concat(all_new_jobs, ignore_index=True)
-    
-    print(f"\n--- Storing a total of {len(final_df)} new jobs in the database ---")
-    # Store the combined dataframe in the database
-    store_data(final_df)
-    
+    pool = DriverPool(workers)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda item: _checkpoint_category(run_id, item[0], item[1], pool, marks.get(item[0]), stream),
+                pending.items(),
+            ))
+    finally:
+        pool.close()
+        shutdown_parse_pool()
+    _print_timings(results, time.perf_counter() - started)
+
+    failed = [result['category'] for result in results if result['error']]
+    finish_pipeline_run(run_id, 'failed' if failed else 'done')
+    print(f"\n--- Stored a total of {sum(result['rows'] for result in results)} new jobs in the database ---")
+    if failed:
+        print(f"Failed categories: {', '.join(failed)}. Run again with --resume to retry just those.")
+
+    if reports:
+        _generate_reports(list(categories))
+
+    _write_run_summary(results, run_started_at, time.perf_counter() - run_started, run_id, shard_label)
     print("\n--- Daily Scraping Pipeline Complete ---")
 
+def _shard(value):
+    """argparse type for --shard: 'k/n' with 1 <= k <= n."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected k/n, e.g. 2/4, got '{value}'")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value} is out of range")
+    return index, count
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Scrape all job categories into the database.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Number of categories to scrape in parallel (default: %(default)s).")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignore stored high-water marks and re-scrape every category from scratch.")
+    parser.add_argument('--reports', action='store_true',
+                        help="Generate the PDF report of every category once the data is stored.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write each category to the database in batches while it is scraped.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue this shard's last run if it was interrupted within RESUME_MAX_AGE_HOURS, skipping the categories it finished.")
+    parser.add_argument('--shard', type=_shard, default=(1, 1), metavar='K/N',
+                        help="Only scrape the K-th of N slices of the category list (default: 1/1).")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    run_daily_pipeline()
\ No newline at end of file
+    args = _parse_args()
+    run_daily_pipeline(workers=args.workers, full=args.full, reports=args.reports, stream=args.stream,
+                       shard=args.shard, resume=args.resume)
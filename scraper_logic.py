@@ -97,19 +97,107 @@
 
 # scraper_logic.py (Updated for Stability and Better Error Handling)
 
+import multiprocessing
+import os
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
 from datetime import datetime
+from functools import lru_cache
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# Selenium, webdriver_manager and BeautifulSoup are imported where they are
+# used: most runs are served by the HTTP backend and the lxml parser and
+# never need them.
+import lxml.html
+from lxml import etree
 
-# <<< CHANGE 1: Import Selenium's TimeoutException for better error handling >>>
-from selenium.common.exceptions import TimeoutException
+import metrics_logic
+
+# Which fetch backend run_scraper uses: 'http' (plain pooled requests),
+# 'selenium' (headless Chrome) or 'auto' (http first, Chrome only if the
+# server-rendered page has no job rows).
+SCRAPER_BACKEND = os.getenv('SCRAPER_BACKEND', 'auto')
+# Which engine turns job rows into records: 'bs4' (BeautifulSoup) or 'lxml'
+# (compiled XPath straight on the lxml tree; same records, several times faster).
+SCRAPER_PARSER = os.getenv('SCRAPER_PARSER', 'lxml')
+HTTP_TIMEOUT = 20
+HTTP_MAX_PAGES = int(os.getenv('SCRAPER_HTTP_MAX_PAGES', '10'))
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Scroll engine tuning: after each scroll the row count is polled with a short
+# exponential backoff, and the list counts as fully loaded once it hasn't grown
+# for SCROLL_IDLE_TIMEOUT seconds.
+SCROLL_POLL_START = 0.25
+SCROLL_POLL_MAX = 2.0
+SCROLL_IDLE_TIMEOUT = float(os.getenv('SCRAPER_SCROLL_IDLE_TIMEOUT', '6'))
+# Optional cutoffs: stop loading once this many rows are on the page, or once
+# postings older than this many days have been reached (0 disables either).
+SCRAPER_MAX_ROWS = int(os.getenv('SCRAPER_MAX_ROWS', '0'))
+SCRAPER_MAX_AGE_DAYS = float(os.getenv('SCRAPER_MAX_AGE_DAYS', '0'))
+# In incremental mode, parsing stops after this many consecutive already-known
+# rows, counted only once a row newer than the high-water mark has been seen:
+# pinned/featured older posts sit above the new ones at the top of the page.
+# Without any new row, the fetch itself stops at the high-water mark's age.
+INCREMENTAL_STOP_AFTER = int(os.getenv('SCRAPER_INCREMENTAL_STOP_AFTER', '3'))
+
+# A chromedriver binary to use as-is, e.g. the one installed next to Chrome in
+# the image. Without it webdriver_manager resolves (and if need be downloads) a
+# matching driver, once per process.
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
+# Directory of Chrome profiles kept between sessions and runs, so the HTTP
+# cache and cookies are warm. Each concurrent session gets its own profile
+# under it; one directory must not be shared by two scraper processes at once.
+# Unset, every session starts from a fresh temporary profile.
+CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR')
+# Resource types Chrome doesn't download: any of 'images', 'fonts' and
+# 'stylesheets'. Job rows are plain HTML, so none of them are needed.
+# Set to an empty string to load pages in full.
+CHROME_BLOCK_RESOURCES = [kind.strip() for kind in os.getenv('CHROME_BLOCK_RESOURCES', 'images,fonts,stylesheets').split(',')
+                          if kind.strip()]
+# URL patterns blocked over the DevTools protocol; images are switched off by a content setting instead
+_BLOCKED_URL_PATTERNS = {
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'stylesheets': ['*.css'],
+}
+
+_ROW_STATE_JS = """
+const rows = document.querySelectorAll('tr[data-slug]');
+const last = rows.length ? rows[rows.length - 1] : null;
+return [rows.length, last ? parseInt(last.getAttribute('data-epoch') || '0', 10) : 0];
+"""
+
+# Rows copied out of the browser per round trip once a page is fully scrolled;
+# each such chunk is also the unit of work for the parse processes.
+BROWSER_ROW_CHUNK = 500
+# Pages with at least PARSE_PROCESS_THRESHOLD rows are parsed chunk by chunk in
+# a pool of PARSE_PROCESSES worker processes; smaller ones stay in-process,
+# where handing the work over would cost more than it saves.
+PARSE_PROCESSES = int(os.getenv('SCRAPER_PARSE_PROCESSES', str(min(4, os.cpu_count() or 1))))
+PARSE_PROCESS_THRESHOLD = int(os.getenv('SCRAPER_PARSE_PROCESS_THRESHOLD', '2000'))
+_ROW_HTML_JS = """
+const rows = Array.from(document.querySelectorAll('tr.job')).slice(arguments[0], arguments[1]);
+return rows.map(row => row.outerHTML).join('');
+"""
+
+_http_local = threading.local()
+# Profile slots under CHROME_PROFILE_DIR held by live sessions of this process
+_profile_slots = set()
+_profile_lock = threading.Lock()
+_driver_path_lock = threading.Lock()
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
 
 def _parse_single_job(job_html):
     # This helper function is fine and doesn't need changes.
@@ -130,11 +218,200 @@ def _parse_single_job(job_html):
         tags_container = job_html.find('td', class_='tags')
         tags = [tag.text.strip() for tag in tags_container.find_all('h3')] if tags_container else []
         if job_title == "N/A" or company == "N/A": return None
-        return {'job_title': job_title, 'company': company, 'location': location, 'date_posted': date_posted, 'tags': tags}
+        return {'slug': job_html['data-slug'], 'job_title': job_title, 'company': company, 'location': location, 'date_posted': date_posted, 'tags': tags}
     except Exception:
         return None
 
-def run_scraper(url):
+
+# Class tests as BeautifulSoup does them: `cls` is one of the space-separated classes
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+_LXML_JOB_ROWS = etree.XPath(f"//tr[{_has_class('job')}]")
+_LXML_TITLE = etree.XPath(".//h2[@itemprop='title'][1]")
+_LXML_COMPANY = etree.XPath("(.//h3[@itemprop='name'])[1]")
+_LXML_LOCATIONS = etree.XPath(f".//div[{_has_class('location')}]")
+_LXML_TAGS = etree.XPath(f"(.//td[{_has_class('tags')}])[1]//h3")
+_LXML_TEXT_NODES = etree.XPath(".//text()")
+
+def _stripped_text(element):
+    """BeautifulSoup's get_text(strip=True): every text node stripped, then joined."""
+    return ''.join(text.strip() for text in _LXML_TEXT_NODES(element))
+
+def _parse_single_job_lxml(job_html):
+    """_parse_single_job for an lxml row element; returns an identical record."""
+    slug = job_html.get('data-slug')
+    if slug is None:
+        return None
+    try:
+        title_tags = _LXML_TITLE(job_html)
+        job_title = title_tags[0].text_content().strip() if title_tags else "N/A"
+        company_tags = _LXML_COMPANY(job_html)
+        company = company_tags[0].text_content().strip() if company_tags else "N/A"
+        if job_title == "N/A" or company == "N/A": return None
+        epoch = job_html.get('data-epoch')
+        date_posted = datetime.fromtimestamp(int(epoch)) if epoch is not None else None
+        location = "No Location"
+        for loc in _LXML_LOCATIONS(job_html):
+            text = _stripped_text(loc)
+            if '💰' not in text:
+                location = text
+                break
+        tags = [tag.text_content().strip() for tag in _LXML_TAGS(job_html)]
+        return {'slug': slug, 'job_title': job_title, 'company': company, 'location': location, 'date_posted': date_posted, 'tags': tags}
+    except Exception:
+        return None
+
+def _job_rows_bs4(html):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml').select('tr.job')
+
+def _job_rows_lxml(html):
+    if not html.strip():
+        return []
+    return _LXML_JOB_ROWS(lxml.html.document_fromstring(html))
+
+# SCRAPER_PARSER -> (function finding the tr.job rows in an HTML string, row parser)
+_PARSERS = {
+    'bs4': (_job_rows_bs4, _parse_single_job),
+    'lxml': (_job_rows_lxml, _parse_single_job_lxml),
+}
+
+def _row_epoch(row):
+    try:
+        return int(row.get('data-epoch', 0))
+    except ValueError:
+        return 0
+
+def _parse_rows_html(html, parser):
+    """
+    Parses every job row with a slug in `html` using the `parser` engine and
+    returns a (slug, epoch, job dict or None) record per row, in page order.
+    This is what parse worker processes run, so it takes and returns only
+    plain, picklable data.
+    """
+    find_rows, parse_row = _PARSERS[parser]
+    return [(row.get('data-slug'), _row_epoch(row), parse_row(row))
+            for row in find_rows(html) if row.get('data-slug') is not None]
+
+def _parse_rows_timed(html, parser):
+    """_parse_rows_html plus the seconds it took, so time spent in parse processes is still recorded."""
+    started = time.perf_counter()
+    records = _parse_rows_html(html, parser)
+    return time.perf_counter() - started, records
+
+def _parse_rows_here(html, parser):
+    """_parse_rows_html in this process, timed as the 'parse' stage."""
+    with metrics_logic.timer('parse'):
+        return _parse_rows_html(html, parser)
+
+def _get_parse_pool():
+    """The process pool shared by all scraping threads, started on first use (None if disabled)."""
+    global _parse_pool
+    if PARSE_PROCESSES <= 1:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn rather than fork: forking would copy the browser and HTTP threads mid-flight
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES,
+                                              mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+def shutdown_parse_pool():
+    """Stops the parse worker processes, if any were started."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(cancel_futures=True)
+            _parse_pool = None
+
+def _parse_chunks(html_chunks, parallel=False):
+    """
+    Yields the row records of every HTML chunk in `html_chunks`, in order.
+    With `parallel`, chunks are handed to the parse processes as they are
+    read, with a few in flight at a time, and their results are yielded
+    back in the order the chunks came in.
+    """
+    parser = SCRAPER_PARSER
+    pool = _get_parse_pool() if parallel else None
+    if pool is None:
+        for html in html_chunks:
+            yield from _parse_rows_here(html, parser)
+        return
+    pending = deque()
+    try:
+        for html in html_chunks:
+            pending.append((html, pool.submit(_parse_rows_timed, html, parser)))
+            if len(pending) >= 2 * PARSE_PROCESSES:
+                yield from _chunk_result(*pending.popleft(), parser)
+        while pending:
+            yield from _chunk_result(*pending.popleft(), parser)
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+def _chunk_result(html, future, parser):
+    """A parse worker's records for `html`, re-parsed in-process if the pool has broken down."""
+    try:
+        seconds, records = future.result()
+    except BrokenProcessPool:
+        print("Parse worker processes died; parsing in-process instead.")
+        shutdown_parse_pool()
+        return _parse_rows_here(html, parser)
+    metrics_logic.observe('parse', seconds)
+    return records
+
+@lru_cache(maxsize=1)
+def _chromedriver_path():
+    """
+    CHROMEDRIVER_PATH, or the driver webdriver_manager resolves. Cached, so
+    its version check (and possible download) runs once per process rather
+    than once per browser session.
+    """
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    from webdriver_manager.chrome import ChromeDriverManager
+    with _driver_path_lock:
+        return ChromeDriverManager().install()
+
+def _claim_profile_slot():
+    """The lowest profile slot not in use by another live session."""
+    with _profile_lock:
+        slot = 0
+        while slot in _profile_slots:
+            slot += 1
+        _profile_slots.add(slot)
+        return slot
+
+def _release_profile_slot(slot):
+    with _profile_lock:
+        _profile_slots.discard(slot)
+
+def _block_resources(driver):
+    """Stops the session downloading the fonts and stylesheets named in CHROME_BLOCK_RESOURCES."""
+    patterns = [pattern for kind in CHROME_BLOCK_RESOURCES for pattern in _BLOCKED_URL_PATTERNS.get(kind, [])]
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        print(f"Could not block {', '.join(CHROME_BLOCK_RESOURCES)} in the browser: {e}")
+
+def _quit_driver(driver):
+    """Ends a session from _create_driver and frees its profile slot."""
+    try:
+        driver.quit()
+    finally:
+        slot = getattr(driver, 'profile_slot', None)
+        if slot is not None:
+            _release_profile_slot(slot)
+
+def _create_driver():
+    """Boots a headless Chrome session with the stability options we rely on."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
     options = webdriver.ChromeOptions()
     options.add_argument("--headless")
     options.add_argument("--log-level=3")
@@ -146,55 +423,352 @@ def run_scraper(url):
     options.add_argument("start-maximized") # Open browser in maximized mode
     options.add_argument("disable-infobars")
     options.add_argument("--disable-extensions")
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    
-    all_jobs_data = []
-    print(f"Fetching job listings from {url}...")
-    
+    if 'images' in CHROME_BLOCK_RESOURCES:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    slot = None
+    if CHROME_PROFILE_DIR:
+        slot = _claim_profile_slot()
+        options.add_argument(f"--user-data-dir={os.path.abspath(os.path.join(CHROME_PROFILE_DIR, f'session-{slot}'))}")
     try:
-        driver.get(url)
-        # <<< CHANGE 3: Increase wait time slightly for slower pages >>>
-        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, "tr[data-slug]")))
-        print("Initial page content loaded.")
+        with metrics_logic.timer('browser_startup'):
+            driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=options)
+    except Exception:
+        if slot is not None:
+            _release_profile_slot(slot)
+        raise
+    driver.profile_slot = slot
+    _block_resources(driver)
+    return driver
 
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        print("Scrolling down to load all job listings...")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                print("Reached the bottom of the page. All jobs loaded.")
+def _driver_is_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+class PageLoadTimeout(Exception):
+    """No job row appeared in the browser in time; raised for selenium's TimeoutException so callers can catch it without importing selenium."""
+
+class DriverPool:
+    """
+    A bounded pool of long-lived Chrome sessions. Sessions are started lazily,
+    handed out one per caller and reused across scrapes; a session that died
+    during a scrape is discarded and replaced on the next checkout.
+    """
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._drivers = []
+
+    @contextmanager
+    def driver(self):
+        self._slots.acquire()
+        driver = None
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = _create_driver()
+                with self._lock:
+                    self._drivers.append(driver)
+            yield driver
+        finally:
+            if driver is not None:
+                if _driver_is_alive(driver):
+                    self._idle.put(driver)
+                else:
+                    self._discard(driver)
+            self._slots.release()
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            _quit_driver(driver)
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                _quit_driver(driver)
+            except Exception:
+                pass
+        print(f"Closed {len(drivers)} pooled browser session(s).")
+
+def _get_http_session():
+    """
+    One keep-alive requests.Session per thread, so connections to remoteok.com
+    are pooled across pages and categories without sharing a session between
+    threads.
+    """
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(HTTP_HEADERS)
+        _http_local.session = session
+    return session
+
+def _iter_rows_http(url, stats, max_rows=None, stop_epoch=None):
+    """
+    Fetches the server-rendered listing page(s) without a browser and yields
+    the (slug, epoch, job) record of each row page by page, recording fetch
+    stats in `stats`. Further
+    pages are requested by offset until a page comes back empty, a cutoff
+    is reached or HTTP_MAX_PAGES is hit. A later page holding only rows
+    already seen means the server ignored the offset: that stops with
+    'pagination_unsupported', as everything past the first page is missing.
+    """
+    session = _get_http_session()
+    seen_slugs = set()
+    stats.update({'backend': 'http', 'http_requests': 0, 'rows_loaded': 0})
+    try:
+        for page in range(HTTP_MAX_PAGES):
+            params = {'offset': stats['rows_loaded']} if page else None
+            with metrics_logic.timer('page_load'):
+                response = session.get(url, params=params, timeout=HTTP_TIMEOUT)
+            stats['http_requests'] += 1
+            response.raise_for_status()
+            page_rows = _parse_rows_here(response.text, SCRAPER_PARSER)
+            new_rows = [record for record in page_rows if record[0] not in seen_slugs]
+            if not new_rows:
+                stats['stop_reason'] = 'pagination_unsupported' if page_rows else 'converged'
+                break
+            seen_slugs.update(slug for slug, _, _ in new_rows)
+            stats['rows_loaded'] += len(new_rows)
+            yield from new_rows
+            if max_rows and stats['rows_loaded'] >= max_rows:
+                stats['stop_reason'] = 'max_rows'
                 break
-            last_height = new_height
+            if stop_epoch and 0 < new_rows[-1][1] < stop_epoch:
+                stats['stop_reason'] = 'max_age'
+                break
+        else:
+            stats['stop_reason'] = 'max_pages'
+    finally:
+        print(f"HTTP backend fetched {stats['rows_loaded']} job rows in {stats['http_requests']} request(s).")
+
+def _is_known(slug, epoch, high_water_mark):
+    last_epoch, last_slug = high_water_mark
+    return slug == last_slug or epoch < last_epoch
 
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, 'lxml')
-        job_listings = soup.select('tr.job')
-        print(f"Found {len(job_listings)} potential job rows on the fully loaded page.")
+def _wait_for_more_rows(driver, row_count):
+    """
+    Polls the row count with exponential backoff until it exceeds `row_count`
+    or SCROLL_IDLE_TIMEOUT passes. Returns (row_count, last_epoch, seconds_waited).
+    """
+    waited, delay = 0.0, SCROLL_POLL_START
+    while True:
+        time.sleep(delay)
+        waited += delay
+        new_count, last_epoch = driver.execute_script(_ROW_STATE_JS)
+        if new_count > row_count or waited >= SCROLL_IDLE_TIMEOUT:
+            return new_count, last_epoch, waited
+        delay = min(delay * 2, SCROLL_POLL_MAX, SCROLL_IDLE_TIMEOUT - waited)
+
+def _scroll_until_loaded(driver, max_rows=None, stop_epoch=None):
+    """
+    Drives the infinite scroll until the number of job rows stops growing,
+    `max_rows` rows are loaded, or the oldest loaded row predates `stop_epoch`.
+    Returns a stats dict with the iteration count and total time spent waiting.
+    """
+    row_count, last_epoch = driver.execute_script(_ROW_STATE_JS)
+    stats = {'backend': 'selenium', 'scroll_iterations': 0, 'scroll_wait_seconds': 0.0}
+    while True:
+        if max_rows and row_count >= max_rows:
+            stop_reason = 'max_rows'
+            break
+        if stop_epoch and 0 < last_epoch < stop_epoch:
+            stop_reason = 'max_age'
+            break
+        with metrics_logic.timer('scroll_iteration'):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            new_count, last_epoch, waited = _wait_for_more_rows(driver, row_count)
+        stats['scroll_iterations'] += 1
+        stats['scroll_wait_seconds'] += waited
+        if new_count <= row_count:
+            stop_reason = 'converged'
+            break
+        row_count = new_count
+    stats['rows_loaded'] = row_count
+    stats['stop_reason'] = stop_reason
+    stats['scroll_wait_seconds'] = round(stats['scroll_wait_seconds'], 2)
+    print(f"Stopped scrolling ({stop_reason}) after {stats['scroll_iterations']} iteration(s), "
+          f"{row_count} rows, {stats['scroll_wait_seconds']}s waiting.")
+    return stats
 
-        for job_html in job_listings:
-            job_info = _parse_single_job(job_html)
+def _iter_rows_in_browser(driver, url, stats, max_rows=None, stop_epoch=None):
+    """
+    Loads `url` in `driver`, scrolls until all wanted jobs are loaded and
+    yields the (slug, epoch, job) record of each row. Rows are pulled out of
+    the page BROWSER_ROW_CHUNK at a time, so neither the whole page source nor
+    a tree of the whole page is ever held in memory, and big pages are parsed
+    on several cores.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with metrics_logic.timer('page_load'):
+        driver.get(url)
+        try:
+            # <<< CHANGE 3: Increase wait time slightly for slower pages >>>
+            WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, "tr[data-slug]")))
+        except TimeoutException as e:
+            raise PageLoadTimeout(url) from e
+    print("Initial page content loaded.")
+
+    print("Scrolling down to load all job listings...")
+    stats.update(_scroll_until_loaded(driver, max_rows=max_rows, stop_epoch=stop_epoch))
+
+    row_count = driver.execute_script("return document.querySelectorAll('tr.job').length;")
+    html_chunks = (f'<table>{driver.execute_script(_ROW_HTML_JS, start, start + BROWSER_ROW_CHUNK)}</table>'
+                   for start in range(0, row_count, BROWSER_ROW_CHUNK))
+    yield from _parse_chunks(html_chunks, parallel=row_count >= PARSE_PROCESS_THRESHOLD)
+
+def _iter_rows_selenium(url, stats, pool=None, max_rows=None, stop_epoch=None):
+    """Yields row records fetched with headless Chrome, borrowing a session from `pool` if given."""
+    if pool is not None:
+        with pool.driver() as driver:
+            yield from _iter_rows_in_browser(driver, url, stats, max_rows, stop_epoch)
+        return
+    driver = _create_driver()
+    try:
+        yield from _iter_rows_in_browser(driver, url, stats, max_rows, stop_epoch)
+    finally:
+        _quit_driver(driver)
+        print("Browser closed.")
+
+def _iter_job_rows(url, stats, pool=None, backend='auto', max_rows=None, stop_epoch=None):
+    """
+    Yields row records from the configured backend. With 'auto', Chrome is
+    started if the server-rendered page has no job rows at all, or to load
+    the rest of the list when the server doesn't paginate; rows the HTTP
+    pages already yielded are skipped then.
+    """
+    seen_slugs = set()
+    if backend in ('auto', 'http'):
+        try:
+            for record in _iter_rows_http(url, stats, max_rows, stop_epoch):
+                seen_slugs.add(record[0])
+                yield record
+        except requests.RequestException as e:
+            print(f"HTTP backend failed for {url}: {e}")
+            if seen_slugs:
+                # Rows already handed on can't be taken back; keep what was fetched
+                stats['stop_reason'] = 'http_error'
+        if stats.get('stop_reason') == 'pagination_unsupported':
+            print(f"{url} ignored the page offset, so only its first page was fetched over HTTP.")
+        if backend == 'auto':
+            if not seen_slugs:
+                print("No job rows in the server-rendered page, falling back to the browser.")
+            elif stats.get('stop_reason') == 'pagination_unsupported':
+                print("Loading the rest of the list in the browser.")
+            else:
+                return
+    if backend in ('selenium', 'auto'):
+        http_rows = len(seen_slugs)
+        stats.clear()
+        if http_rows:
+            stats['http_rows'] = http_rows
+        for record in _iter_rows_selenium(url, stats, pool, max_rows, stop_epoch):
+            if record[0] not in seen_slugs:
+                yield record
+
+def stream_jobs(url, pool=None, backend=None, max_rows=None, stop_epoch=None, high_water_mark=None, meta=None):
+    """
+    Generator behind run_scraper: yields the parsed job dicts from `url` in
+    page order while later rows are still being fetched, so callers can
+    process them in batches instead of holding the whole category. Takes the
+    same arguments as run_scraper. Fetch errors are raised, not swallowed.
+
+    Once the generator is exhausted, `meta` (a dict, if given) holds the
+    'scrape_stats' and 'high_water_mark' that run_scraper attaches as attrs.
+    """
+    backend = backend or SCRAPER_BACKEND
+    max_rows = max_rows or SCRAPER_MAX_ROWS or None
+    if stop_epoch is None and high_water_mark:
+        stop_epoch = high_water_mark[0]
+    if stop_epoch is None and SCRAPER_MAX_AGE_DAYS:
+        stop_epoch = int(time.time() - SCRAPER_MAX_AGE_DAYS * 86400)
+    print(f"Fetching job listings from {url}...")
+
+    stats = {}
+    newest = None
+    row_count = parsed_count = known_in_a_row = 0
+    seen_new_row = False
+    with closing(_iter_job_rows(url, stats, pool, backend, max_rows, stop_epoch)) as job_listings:
+        for slug, epoch, job_info in job_listings:
+            if max_rows and row_count >= max_rows:
+                break
+            row_count += 1
+            # The newest row seen becomes the next run's high-water mark
+            if newest is None or epoch > newest[0]:
+                newest = (epoch, slug)
+
+            if high_water_mark and _is_known(slug, epoch, high_water_mark):
+                known_in_a_row += seen_new_row
+                if known_in_a_row >= INCREMENTAL_STOP_AFTER:
+                    print("Reached postings already stored by a previous run.")
+                    stats['stop_reason'] = 'known_rows'
+                    break
+                continue
+            known_in_a_row = 0
+            seen_new_row = True
             if job_info:
-                all_jobs_data.append(job_info)
-        
-        print(f"Successfully parsed {len(all_jobs_data)} jobs.")
-        
-        if not all_jobs_data:
-            return pd.DataFrame()
+                parsed_count += 1
+                yield job_info
+
+    print(f"Found {row_count} potential job rows, successfully parsed {parsed_count} jobs.")
+    metrics_logic.inc('rows_parsed', parsed_count)
+    if stats.get('stop_reason') == 'pagination_unsupported':
+        # Rows past the first page were never fetched; moving the mark past them would skip them for good
+        newest = high_water_mark
+    if high_water_mark and (newest is None or newest[0] < high_water_mark[0]):
+        newest = high_water_mark
+    if meta is not None:
+        meta['scrape_stats'] = stats
+        meta['high_water_mark'] = newest
 
-        return pd.DataFrame(all_jobs_data)
+def run_scraper(url, pool=None, backend=None, max_rows=None, stop_epoch=None, high_water_mark=None):
+    """
+    Scrapes all job listings from `url` and returns them as a DataFrame
+    (None on failure). `backend` overrides SCRAPER_BACKEND; when Chrome is
+    needed a session is borrowed from `pool` (a DriverPool) if one is given,
+    otherwise a fresh one is started and closed here.
+
+    Loading stops early once `max_rows` rows are loaded or postings older than
+    `stop_epoch` (unix seconds) are reached; both default to the
+    SCRAPER_MAX_ROWS / SCRAPER_MAX_AGE_DAYS settings. Fetch statistics (scroll
+    iterations, wait time, ...) are attached as df.attrs['scrape_stats'].
+
+    With a `high_water_mark` of (epoch, slug) from a previous run, only the
+    postings newer than it are loaded and parsed. The newest (epoch, slug) seen
+    this time is attached as df.attrs['high_water_mark'].
+    """
+    meta = {}
+    try:
+        df = pd.DataFrame(list(stream_jobs(url, pool, backend, max_rows, stop_epoch, high_water_mark, meta)))
+        df.attrs.update(meta)
+        return df
 
     # <<< CHANGE 4: Add specific error handling for timeouts >>>
-    except TimeoutException:
+    except PageLoadTimeout:
         print(f"Error: Timed out waiting for job listings to load on {url}.")
         print("This could mean the page has no jobs or the structure has changed.")
         return None # Return None to indicate failure
     except Exception as e:
         print(f"An unexpected error occurred during scraping: {e}")
         return None
-    finally:
-        driver.quit()
-        print("Browser closed.")
\ No newline at end of file
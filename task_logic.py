@@ -0,0 +1,129 @@
+# task_logic.py
+
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from database_logic import connection, store_data
+
+# Report runs executed at once by each web worker; the rest wait in the queue
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', '2'))
+# A task that hasn't moved on for this long belongs to a worker that died mid-run
+TASK_STALE_SECONDS = int(os.getenv('TASK_STALE_SECONDS', '1800'))
+
+# queued -> scraping -> cleaning -> storing -> reporting -> done, or failed at any stage
+FINAL_STATUSES = ('done', 'failed')
+STALE_TASK_ERROR = 'Task was interrupted before it finished.'
+
+_executor = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix='report-task')
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def _update_task(task_id, status, filename=None, error=None):
+    """Records the stage a task has reached; a final status also releases its category."""
+    active = 0 if status in FINAL_STATUSES else 1
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                "UPDATE report_tasks SET status = ?, active = ?, filename = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, active, filename, error, _now(), task_id),
+            )
+
+def _stale_cutoff():
+    return (datetime.now() - timedelta(seconds=TASK_STALE_SECONDS)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def _fail_stale_tasks(conn):
+    """Marks tasks abandoned by a crashed or restarted worker as failed so their category can run again."""
+    cursor = conn.execute(
+        "UPDATE report_tasks SET status = 'failed', active = 0, error = ?, updated_at = ? WHERE active = 1 AND updated_at < ?",
+        (STALE_TASK_ERROR, _now(), _stale_cutoff()),
+    )
+    if cursor.rowcount:
+        print(f"Marked {cursor.rowcount} stale report tasks as failed.")
+
+def _run_report_task(task_id, category, url):
+    """Scrapes, cleans, stores and reports on `category`, recording each stage on the task row."""
+    # Imported on the first report rather than at app startup: between them
+    # these pull in requests, the LLM client, matplotlib, seaborn and fpdf
+    from scraper_logic import run_scraper
+    from cleaner_logic import clean_data
+    from reporter_logic import generate_report
+
+    try:
+        _update_task(task_id, 'scraping')
+        raw_df = run_scraper(url)
+        if raw_df is None or raw_df.empty:
+            _update_task(task_id, 'failed', error=f"Could not find jobs for '{category}'.")
+            return
+
+        _update_task(task_id, 'cleaning')
+        cleaned_df = clean_data(raw_df, category=category)
+
+        _update_task(task_id, 'storing')
+        store_data(cleaned_df)
+
+        _update_task(task_id, 'reporting')
+        report_path = generate_report(category=category)
+        if report_path and os.path.exists(report_path):
+            _update_task(task_id, 'done', filename=os.path.basename(report_path))
+        else:
+            _update_task(task_id, 'failed', error='Failed to generate the report file.')
+    except Exception as e:
+        print(f"Report task {task_id} for '{category}' failed: {e}")
+        _update_task(task_id, 'failed', error='An unexpected error occurred while generating the report.')
+
+def enqueue_report(category, url):
+    """
+    Queues a scrape-and-report run for `category` and returns (task_id,
+    created). If a run for the same category is already queued or running,
+    in this worker or any other, its id is returned instead with created=False.
+    """
+    with connection() as conn:
+        for _ in range(2):
+            task_id = uuid.uuid4().hex
+            try:
+                with conn:
+                    _fail_stale_tasks(conn)
+                    now = _now()
+                    conn.execute(
+                        "INSERT INTO report_tasks (id, category, status, active, created_at, updated_at) VALUES (?, ?, 'queued', 1, ?, ?)",
+                        (task_id, category, now, now),
+                    )
+            except sqlite3.IntegrityError:
+                row = conn.execute("SELECT id FROM report_tasks WHERE category = ? AND active = 1", (category,)).fetchone()
+                if row:
+                    return row[0], False
+                # The active task finished between our insert and the lookup; try again
+                continue
+            break
+        else:
+            raise RuntimeError(f"Could not queue a report task for '{category}'.")
+
+    _executor.submit(_run_report_task, task_id, category, url)
+    print(f"Queued report task {task_id} for '{category}'.")
+    return task_id, True
+
+def get_task(task_id):
+    """
+    Returns the task row as a dict, or None if there is no such task. A task
+    that hasn't moved on for TASK_STALE_SECONDS is reported as failed, so
+    pollers stop waiting on a worker that died; the row itself is marked
+    failed by the next enqueue_report, as /status only reads.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        # On the cursor, not the pooled connection every other caller shares
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute(
+            "SELECT id, category, status, filename, error, created_at, updated_at FROM report_tasks WHERE id = ?",
+            (task_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    task = dict(row)
+    if task['status'] not in FINAL_STATUSES and task['updated_at'] < _stale_cutoff():
+        task.update(status='failed', error=STALE_TASK_ERROR)
+    return task